@@ -0,0 +1,120 @@
+"""
+Apache Arrow IPC responses for Sales Analytics System
+Chart-sized series as Arrow record batches (application/vnd.apache.arrow.stream)
+instead of row-oriented JSON, negotiated from the request's Accept header.
+Batches are built from whole columns: PostgreSQL results are streamed with COPY
+and parsed by Arrow's CSV reader, so no Python object is created per row.
+pyarrow is optional; without it clients that also accept JSON get JSON.
+"""
+
+import io
+from typing import Dict, Mapping, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Column type names used by the field lists in projections.py and the in-memory server
+ARROW_TYPES = {
+    "int64": lambda: pa.int64(),
+    "float64": lambda: pa.float64(),
+    "string": lambda: pa.string(),
+    "bool": lambda: pa.bool_(),
+    "date32": lambda: pa.date32(),
+    "timestamp": lambda: pa.timestamp("us", tz="UTC"),
+}
+
+def parse_accept(header: str) -> Dict[str, float]:
+    """Map each media range in an Accept header to its quality value"""
+    accepted = {}
+    for part in header.split(","):
+        media_range, *params = part.strip().split(";")
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_range.strip().lower()] = quality
+    return accepted
+
+def negotiate(header: Optional[str]) -> Optional[str]:
+    """
+    "arrow" when the client asks for Arrow at least as strongly as for JSON and
+    pyarrow is installed, None when it asks only for Arrow and pyarrow is missing,
+    otherwise "json", so clients that never mention Arrow are unaffected.
+    """
+    if not header:
+        return "json"
+    accepted = parse_accept(header)
+    wildcard = max(accepted.get("*/*", 0.0), accepted.get("application/*", 0.0))
+    arrow = accepted.get(ARROW_STREAM, 0.0)
+    json_quality = accepted.get("application/json", wildcard)
+    if pa is not None and arrow > 0 and arrow >= json_quality:
+        return "arrow"
+    if arrow > 0 and json_quality == 0:
+        return None
+    return "json"
+
+def require_representation(header: Optional[str]) -> str:
+    """`negotiate`, answering 406 Not Acceptable when only an unavailable format is"""
+    representation = negotiate(header)
+    if representation is None:
+        supported = ["application/json"] + ([ARROW_STREAM] if pa is not None else [])
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Supported formats: {', '.join(supported)}"
+        )
+    return representation
+
+def schema(fields: Sequence[str], types: Mapping[str, str]):
+    return pa.schema([(field, ARROW_TYPES[types[field]]()) for field in fields])
+
+def table_to_ipc(table) -> bytes:
+    sink = io.BytesIO()
+    with pa_ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def columns_to_ipc(columns: Mapping[str, Sequence], types: Optional[Mapping[str, str]] = None) -> bytes:
+    """IPC stream from whole columns; values are cast to `types` (e.g. ISO date strings to date32)"""
+    arrays = []
+    for field, values in columns.items():
+        array = pa.array(values)
+        if types and field in types:
+            array = array.cast(ARROW_TYPES[types[field]]())
+        arrays.append(array)
+    return table_to_ipc(pa.Table.from_arrays(arrays, names=list(columns)))
+
+def records_to_ipc(records: Sequence[Mapping], fields: Sequence[str], types: Optional[Mapping[str, str]] = None) -> bytes:
+    """IPC stream from in-memory records, gathered one column at a time"""
+    return columns_to_ipc({field: [record.get(field) for record in records] for field in fields}, types)
+
+def copy_to_ipc(dbapi_connection, sql: str, fields: Sequence[str], types: Mapping[str, str]) -> bytes:
+    """
+    Run `sql` through PostgreSQL COPY ... TO STDOUT as CSV and parse it into Arrow
+    columns in C; psycopg2 never builds a tuple per row. `sql` must have its
+    parameters rendered inline and select exactly `fields`, in order.
+    """
+    buffer = io.BytesIO()
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    table = pa_csv.read_csv(buffer, convert_options=pa_csv.ConvertOptions(
+        column_types=schema(fields, types),
+        # COPY writes NULL unquoted and empty strings quoted
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False
+    ))
+    return table_to_ipc(table)
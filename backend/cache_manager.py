@@ -0,0 +1,363 @@
+"""
+Caching utilities for Sales Analytics System
+Local in-process LRU caches with an optional shared Redis tier.
+The Redis tier is a redis_pool.GuardedRedis: reads are awaited with a short
+deadline, writes and invalidations are submitted in the background, and either
+way a failing Redis only means falling back to the local tier.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@dataclass
+class UserPrincipal:
+    """Detached snapshot of the user fields needed to authorize a request"""
+    id: int
+    email: str
+    name: str
+    role: str
+    is_active: bool
+    permissions: List[str] = field(default_factory=list)
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            role=user.role,
+            is_active=bool(user.is_active),
+            permissions=list(user.permissions or []),
+            created_at=user.created_at
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "UserPrincipal":
+        data = json.loads(raw)
+        if data.get("created_at"):
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+# Store a principal only if its email's version is still the one read before
+# the database lookup, so a write racing an invalidation cannot resurrect it
+SET_IF_VERSION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SETEX', KEYS[1], ARGV[2], ARGV[3])
+return 1
+"""
+
+class UserPrincipalCache:
+    """
+    Two-tier cache of user principals keyed by email.
+    The Redis tier (when available) is shared by every replica. Invalidations are
+    also published over Redis pub/sub, so every replica running
+    `listen_for_invalidations` drops its local copy at once; the local TTL only
+    bounds staleness while that subscription is down. Entries loaded from the
+    database are stored only if no invalidation landed while they were read.
+    """
+
+    def __init__(self, redis_client=None, max_entries: int = 4096,
+                 local_ttl_seconds: float = 30.0, redis_ttl_seconds: int = 300,
+                 key_prefix: str = "user_principal:"):
+        self.redis_client = redis_client
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.key_prefix = key_prefix
+        self.channel = f"{key_prefix}invalidate"
+        self.local = LocalLRUCache(max_entries=max_entries, ttl_seconds=local_ttl_seconds)
+        # Bumped by every invalidation this replica sees, local or published
+        self._invalidations = 0
+
+    def _redis_key(self, email: str) -> str:
+        # The hash tag keeps an entry and its version on one Redis Cluster slot
+        return f"{self.key_prefix}{{{email.lower()}}}"
+
+    def _version_key(self, email: str) -> str:
+        return f"{self._redis_key(email)}:version"
+
+    async def get(self, email: str) -> Optional[UserPrincipal]:
+        principal = self.local.get(email.lower())
+        if principal is not None:
+            return principal
+
+        if self.redis_client:
+            key, invalidations = self._redis_key(email), self._invalidations
+            raw = await self.redis_client.run(lambda r: r.get(key))
+            if raw:
+                principal = UserPrincipal.from_json(raw)
+                if invalidations == self._invalidations:
+                    self.local.set(email.lower(), principal)
+                return principal
+
+        return None
+
+    async def generation(self, email: str) -> Tuple[int, Optional[str]]:
+        """
+        Token to take before reading a principal from the database and hand to
+        `set`, which then drops the write if the email was invalidated meanwhile
+        """
+        local = self._invalidations
+        if not self.redis_client:
+            return local, None
+        key = self._version_key(email)
+        # False when Redis could not be asked; a missing key is version "0"
+        version = await self.redis_client.run(lambda r: r.get(key), default=False)
+        return local, None if version is False else (version or "0")
+
+    def set(self, principal: UserPrincipal, generation: Tuple[int, Optional[str]]):
+        local, version = generation
+        if local != self._invalidations:
+            return
+        self.local.set(principal.email.lower(), principal)
+        if self.redis_client and version is not None:
+            keys = [self._redis_key(principal.email), self._version_key(principal.email)]
+            args = [version, self.redis_ttl_seconds, principal.to_json()]
+            self.redis_client.submit(lambda r: r.eval(SET_IF_VERSION_SCRIPT, len(keys), *keys, *args))
+
+    def invalidate(self, email: str):
+        email = email.lower()
+        self._invalidations += 1
+        self.local.delete(email)
+        if self.redis_client:
+            key, version_key, channel = self._redis_key(email), self._version_key(email), self.channel
+            ttl = self.redis_ttl_seconds
+
+            async def drop(r):
+                # Version and shared copy first, so a peer reloading after the
+                # message cannot get it back, nor store a read taken before it
+                async with r.pipeline(transaction=True) as pipe:
+                    pipe.incr(version_key).expire(version_key, ttl).delete(key)
+                    await pipe.execute()
+                return await r.publish(channel, email)
+
+            self.redis_client.submit(drop)
+
+    async def listen_for_invalidations(self, retry_seconds: float = 5.0, poll_seconds: float = 1.0):
+        """
+        Drop local entries as any replica invalidates them; runs until cancelled.
+        Invalidations published while the subscription was down are missed, so
+        the local tier is cleared every time it is (re)established.
+        """
+        while self.redis_client is not None:
+            pubsub = self.redis_client.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._invalidations += 1
+                self.local.clear()
+                while True:
+                    # Polled with a timeout: a blocking read would trip the pool's socket timeout
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=poll_seconds)
+                    if message is not None:
+                        self._invalidations += 1
+                        self.local.delete(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"User principal invalidation subscription lost: {e!r}")
+            finally:
+                await pubsub.reset()
+            await asyncio.sleep(retry_seconds)
+
+    def clear(self):
+        self.local.clear()
+
+class RecentWriters:
+    """
+    Remembers principals that committed a write in the last few seconds, so that
+    their reads can stick to the primary until replicas have caught up.
+    Shared through Redis when available so stickiness follows the user across replicas.
+    """
+
+    def __init__(self, redis_client=None, window_seconds: int = 10,
+                 max_entries: int = 10000, key_prefix: str = "recent_write:"):
+        self.redis_client = redis_client
+        self.window_seconds = window_seconds
+        self.key_prefix = key_prefix
+        self.local = LocalLRUCache(max_entries=max_entries, ttl_seconds=window_seconds)
+
+    def mark(self, key: str):
+        self.local.set(key, True)
+        if self.redis_client:
+            redis_key = f"{self.key_prefix}{key}"
+            self.redis_client.submit(lambda r: r.setex(redis_key, self.window_seconds, 1))
+
+    async def wrote_recently(self, key: str) -> bool:
+        if self.local.get(key):
+            return True
+        if self.redis_client:
+            redis_key = f"{self.key_prefix}{key}"
+            return bool(await self.redis_client.run(lambda r: r.exists(redis_key), default=0))
+        return False
+
+class TaggedResponseCache:
+    """
+    Read-through cache for computed API responses.
+    Entries are namespaced by endpoint and permission class and expire after a TTL.
+    Each tag carries a version counter that is folded into the cache key, so
+    bumping a tag (e.g. "sales" after a write) makes every dependent entry
+    unreachable in a single operation on every replica.
+    """
+
+    def __init__(self, redis_client=None, default_ttl_seconds: int = 60,
+                 max_entries: int = 1024, key_prefix: str = "response_cache:"):
+        self.redis_client = redis_client
+        self.default_ttl_seconds = default_ttl_seconds
+        self.key_prefix = key_prefix
+        self.local = LocalLRUCache(max_entries=max_entries, ttl_seconds=default_ttl_seconds)
+        self._local_tag_versions = {}
+        self._pending_bumps = set()
+        self._lock = threading.Lock()
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    async def _tag_versions(self, tags: List[str]) -> List[int]:
+        if self.redis_client and tags:
+            # Let this replica's own bumps land first, so a read right after a write
+            # never addresses the version from before it. Each is bounded by the call timeout.
+            with self._lock:
+                pending = [asyncio.wrap_future(bump) for bump in self._pending_bumps]
+            if pending:
+                await asyncio.wait(pending)
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            versions = await self.redis_client.run(lambda r: r.mget(tag_keys))
+            if versions is not None:
+                return [int(v or 0) for v in versions]
+        with self._lock:
+            return [self._local_tag_versions.get(tag, 0) for tag in tags]
+
+    async def make_key(self, namespace: str, permission_class: str, params: Optional[dict], tags: List[str]) -> str:
+        versions = await self._tag_versions(tags)
+        tag_part = ",".join(f"{tag}={version}" for tag, version in zip(tags, versions))
+        param_part = json.dumps(params or {}, sort_keys=True, default=str)
+        return f"{self.key_prefix}{namespace}:{permission_class}:{param_part}:{tag_part}"
+
+    async def lookup(self, namespace: str, permission_class: str = "standard",
+                     params: Optional[dict] = None, tags: Optional[List[str]] = None,
+                     ttl_seconds: Optional[int] = None) -> Tuple[str, Any]:
+        """
+        Cache key for these arguments and the cached value (None on a miss). Store a
+        computed value under the returned key, so a write that lands meanwhile wins.
+        """
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        key = await self.make_key(namespace, permission_class, params, sorted(tags or []))
+
+        value = self.local.get(key)
+        if value is None and self.redis_client:
+            raw = await self.redis_client.run(lambda r: r.get(key))
+            if raw:
+                value = json.loads(raw)
+                self.local.set(key, value, ttl)
+        return key, value
+
+    def store(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        self.local.set(key, value, ttl)
+        if self.redis_client:
+            raw = json.dumps(value, default=str)
+            self.redis_client.submit(lambda r: r.setex(key, ttl, raw))
+
+    async def get_or_compute(self, namespace: str, compute, permission_class: str = "standard",
+                       params: Optional[dict] = None, tags: Optional[List[str]] = None,
+                       ttl_seconds: Optional[int] = None) -> Any:
+        """
+        Return the cached value for this key, computing and storing it on a miss.
+        `compute` is blocking (it queries the database), so it runs in the threadpool.
+        """
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return await run_in_threadpool(compute)
+
+        key, value = await self.lookup(namespace, permission_class, params, tags, ttl)
+        if value is None:
+            value = await run_in_threadpool(compute)
+            self.store(key, value, ttl)
+        return value
+
+    def invalidate_tags(self, tags):
+        """Bump the version of every tag so that dependent entries are no longer addressed"""
+        with self._lock:
+            for tag in tags:
+                self._local_tag_versions[tag] = self._local_tag_versions.get(tag, 0) + 1
+        if self.redis_client:
+            tag_keys = [self._tag_key(tag) for tag in tags]
+
+            async def bump(r):
+                async with r.pipeline(transaction=False) as pipe:
+                    for tag_key in tag_keys:
+                        pipe.incr(tag_key)
+                    return await pipe.execute()
+
+            future = self.redis_client.submit(bump)
+            if future is not None:
+                with self._lock:
+                    self._pending_bumps.add(future)
+                future.add_done_callback(self._bump_done)
+
+    def _bump_done(self, future):
+        # Done callbacks run on the loop thread; invalidations may come from worker threads
+        with self._lock:
+            self._pending_bumps.discard(future)
+
+    def clear(self):
+        self.local.clear()
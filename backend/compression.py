@@ -0,0 +1,245 @@
+"""
+HTTP response compression for Sales Analytics System
+gzip, and Brotli when the brotli package is installed, negotiated from the
+request's Accept-Encoding and applied above a size threshold. Large bodies are
+compressed in the threadpool so the event loop keeps serving other requests.
+Bodies that are cached are stored with their compressed variants, so hot
+payloads are compressed once instead of on every request.
+"""
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts both with the same quality
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "application/vnd.apache.arrow.",
+)
+
+# Event streams stay open for hours; a compressor per connection costs more
+# memory across thousands of subscribers than compressing small frames saves
+NEVER_COMPRESSED_TYPES = ("text/event-stream",)
+
+# (gzip level, brotli quality). Data bodies are recompressed after every write, so
+# they use the fast levels; maximum levels only pay off for assets compressed once per deploy.
+DYNAMIC_LEVELS = (6, 4)
+STATIC_LEVELS = (9, 11)
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its quality value"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+def choose_encoding(header: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(NEVER_COMPRESSED_TYPES)
+
+def compress(body: bytes, encoding: str, levels=DYNAMIC_LEVELS) -> bytes:
+    gzip_level, brotli_quality = levels
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+class StreamCompressor:
+    """
+    Incremental compressor for responses sent in several body messages. Every
+    chunk is flushed, so streamed rows and events reach the client as they are
+    produced instead of when the compressor's buffer fills.
+    """
+
+    def __init__(self, encoding: str, levels=DYNAMIC_LEVELS):
+        gzip_level, brotli_quality = levels
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._flush, self._finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress, self._finish = compressor.compress, compressor.flush
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def compress(self, chunk: bytes, final: bool = False) -> bytes:
+        data = self._compress(chunk) if chunk else b""
+        return data + (self._finish() if final else self._flush())
+
+class CompressionMiddleware:
+    """
+    Compress responses of a compressible content type whose body is at least
+    `minimum_size` bytes. Bodies of `offload_size` bytes or more are compressed
+    in the threadpool. Streaming responses are compressed chunk by chunk.
+    Responses that already carry a Content-Encoding are passed through, which is
+    how precompressed cached bodies (EncodedBodyCache) skip this middleware.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, offload_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        streamer: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, streamer, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body message shows how large the response is
+                start_message = message
+                return
+            if streamer is not None:
+                final = not message.get("more_body", False)
+                await send({**message, "body": streamer.compress(message.get("body", b""), final)})
+                return
+
+            headers = MutableHeaders(raw=list(start_message.get("headers", [])))
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            eligible = (
+                "content-encoding" not in headers
+                and is_compressible(headers.get("content-type"))
+                and start_message["status"] not in (204, 206, 304)
+            )
+            if not eligible or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                streamer = StreamCompressor(encoding)
+                body = streamer.compress(body)
+            else:
+                body = await self.compress(body, encoding)
+                headers["Content-Length"] = str(len(body))
+            await send({**start_message, "headers": headers.raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= self.offload_size:
+            return await run_in_threadpool(compress, body, encoding)
+        return compress(body, encoding)
+
+class EncodedBody:
+    """A serialized response body and its compressed variants, each encoded on first use"""
+
+    def __init__(self, body: bytes, media_type: str, levels=DYNAMIC_LEVELS):
+        self.body = body
+        self.media_type = media_type
+        self.levels = levels
+        self.variants: Dict[str, bytes] = {}
+
+    async def response(self, request: Request, minimum_size: int = 1024,
+                       headers: Optional[Dict[str, str]] = None) -> Response:
+        headers = dict(headers or {})
+        headers["Vary"] = f"{headers['Vary']}, Accept-Encoding" if "Vary" in headers else "Accept-Encoding"
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding is None or len(self.body) < minimum_size:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        if encoding not in self.variants:
+            self.variants[encoding] = await run_in_threadpool(compress, self.body, encoding, self.levels)
+        headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+class EncodedBodyCache:
+    """
+    Serialized bodies of hot responses, kept with their compressed variants.
+    Keys are tuples whose first element is a namespace; invalidating a namespace
+    drops its entries, and a render that started before the invalidation is not stored.
+    """
+
+    def __init__(self, max_entries: int = 32, minimum_size: int = 1024, levels=DYNAMIC_LEVELS):
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self.levels = levels
+        self._entries: "OrderedDict[tuple, EncodedBody]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    async def respond(self, request: Request, key: tuple, render: Callable[[], bytes],
+                      media_type: str = "application/json",
+                      headers: Optional[Dict[str, str]] = None) -> Response:
+        """Serve the cached body for `key`, rendering it in the threadpool on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            generation = self._generations.get(key[0], 0)
+
+        if entry is None:
+            entry = EncodedBody(await run_in_threadpool(render), media_type, self.levels)
+            with self._lock:
+                if self._generations.get(key[0], 0) == generation:
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        return await entry.response(request, self.minimum_size, headers)
+
+    def invalidate(self, namespace: Hashable):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
@@ -0,0 +1,41 @@
+"""
+Sparse fieldsets for list endpoints
+Resolves a `fields=a,b,c` query parameter against the fields a caller may see,
+so that list endpoints select and serialize only the requested columns
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+# Users are bucketed by the data they may see; payloads and cached responses
+# are shared within a bucket. Only the financial bucket sees margins and costs.
+FINANCIAL = "financial"
+STANDARD = "standard"
+
+def permission_class_for(financial_access: bool) -> str:
+    return FINANCIAL if financial_access else STANDARD
+
+def select_fields(requested: Optional[str], visible: Sequence[str]) -> List[str]:
+    """
+    Fields to return for a `fields` query parameter, in the endpoint's own order so
+    that equal sets share cached responses; every visible field when it is absent.
+    Unknown fields and fields hidden from the caller are rejected with the same
+    error, which does not reveal which hidden fields exist.
+    """
+    if requested is None:
+        return list(visible)
+    names = {name.strip() for name in requested.split(",") if name.strip()}
+    if not names:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fields must name at least one field")
+    unknown = sorted(names.difference(visible))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(visible)}"
+        )
+    return [field for field in visible if field in names]
+
+def project_records(records: Iterable[dict], fields: Sequence[str]) -> List[Dict]:
+    """Copies of in-memory records holding only `fields`"""
+    return [{field: record.get(field) for field in fields} for record in records]
@@ -0,0 +1,134 @@
+"""
+Logging pipeline for Sales Analytics System
+Request handlers only enqueue records; a background listener thread formats
+them as JSON lines and does the file and console I/O
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from metrics import registry
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+RESERVED_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample_rate"}
+
+LOG_RECORDS_DROPPED = registry.counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full")
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the record's `extra` fields inlined"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if getattr(record, "sample_rate", 1.0) < 1.0:
+            entry["sample_rate"] = record.sample_rate
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records from high-volume loggers.
+    Rates are matched on the longest logger-name prefix; CRITICAL records are never dropped.
+    Kept records carry their sample_rate so counts can be re-weighted downstream.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+
+    def rate_for(self, name: str) -> float:
+        while name:
+            if name in self.sample_rates:
+                return self.sample_rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or record.levelno >= logging.CRITICAL:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Never blocks the caller: when the queue is full the record is dropped and
+    counted in log_records_dropped_total on /metrics
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback in the caller, but leave JSON formatting to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse 'logger=rate,other.logger=rate' into a mapping"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = "app.log",
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                  queue_size: int = 10000, sample_rates: Optional[Dict[str, float]] = None) -> logging.handlers.QueueListener:
+    """
+    Route the root logger through a bounded queue to a background listener that
+    writes JSON lines to stderr and a size-rotated log file.
+    """
+    formatter = JSONFormatter()
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,47 @@
+"""
+Alembic environment for the Sales Analytics database
+Runs against DATABASE_URL, or against the connection handed over by
+database_enhanced.ensure_schema when migrations run during startup
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from database_enhanced import Base, engine
+
+config = context.config
+connection = config.attributes.get("connection")
+
+# Only the alembic CLI configures logging; the servers keep their own setup
+if config.config_file_name is not None and connection is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as own_connection:
+        context.configure(connection=own_connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
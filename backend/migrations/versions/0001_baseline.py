@@ -0,0 +1,184 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+Creates every table, the default sales partition and the sales rollup triggers
+as they were at this revision; the tables and SQL are written out here rather
+than taken from the models, so later model changes (and the migrations that
+make them) do not change what this revision creates. Tables that already exist
+are skipped, not altered; 0002_adopt_legacy_schema brings databases created by
+init.sql or by earlier create_all boots in line.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def baseline_metadata() -> sa.MetaData:
+    metadata = sa.MetaData()
+    sa.Table(
+        "users", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("email", sa.String(255), unique=True, index=True, nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("permissions", sa.ARRAY(sa.String).with_variant(sa.JSON, "sqlite")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    sa.Table(
+        "customers", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), unique=True, index=True),
+        sa.Column("phone", sa.String(50)),
+        sa.Column("company", sa.String(255)),
+        sa.Column("address", sa.Text),
+        sa.Column("city", sa.String(100)),
+        sa.Column("state", sa.String(100)),
+        sa.Column("country", sa.String(100)),
+        sa.Column("postal_code", sa.String(20)),
+        sa.Column("customer_type", sa.String(50)),
+        sa.Column("status", sa.String(50)),
+        sa.Column("credit_limit", sa.DECIMAL(12, 2)),
+        sa.Column("notes", sa.Text),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("created_by", sa.Integer, sa.ForeignKey("users.id")),
+    )
+    sa.Table(
+        "products", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("unit_price", sa.Float, nullable=False),
+        sa.Column("cost_price", sa.Float, nullable=False),
+        sa.Column("stock_quantity", sa.Integer),
+        sa.Column("description", sa.Text),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    sales = sa.Table(
+        "sales", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True, index=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("customer_id", sa.Integer, sa.ForeignKey("customers.id"), nullable=True),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("unit_price", sa.Float, nullable=False),
+        sa.Column("sale_date", sa.Date, primary_key=True, nullable=False),
+        sa.Column("customer_name", sa.String(255), nullable=False),
+        sa.Column("region", sa.String(100), nullable=False),
+        sa.Column("salesperson", sa.String(255), nullable=False),
+        sa.Column("profit_margin", sa.Float),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Index("idx_sales_date", "sale_date"),
+        sa.Index("idx_sales_product", "product_id"),
+        sa.Index("idx_sales_region", "region"),
+        sa.Index("idx_sales_salesperson", "salesperson"),
+        postgresql_partition_by="RANGE (sale_date)",
+    )
+    sa.event.listen(sales, "after_create", sa.DDL(
+        "CREATE TABLE IF NOT EXISTS sales_default PARTITION OF sales DEFAULT"
+    ).execute_if(dialect="postgresql"))
+    sa.Table(
+        "sales_daily_rollup", metadata,
+        sa.Column("sale_date", sa.Date, primary_key=True),
+        sa.Column("region", sa.String(100), primary_key=True),
+        sa.Column("product_id", sa.Integer, primary_key=True),
+        sa.Column("salesperson", sa.String(255), primary_key=True),
+        sa.Column("revenue", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("units", sa.Integer, nullable=False),
+        sa.Column("cogs", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("order_count", sa.Integer, nullable=False),
+    )
+    return metadata
+
+SALES_ROLLUP_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION sales_rollup_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO sales_daily_rollup AS r
+            (sale_date, region, product_id, salesperson, revenue, units, cogs, order_count)
+        SELECT o.sale_date, o.region, o.product_id, o.salesperson,
+               -SUM(o.quantity * o.unit_price), -SUM(o.quantity),
+               -SUM(o.quantity * p.cost_price), -COUNT(*)
+        FROM old_rows o JOIN products p ON p.id = o.product_id
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (sale_date, region, product_id, salesperson) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            cogs = r.cogs + EXCLUDED.cogs,
+            order_count = r.order_count + EXCLUDED.order_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO sales_daily_rollup AS r
+            (sale_date, region, product_id, salesperson, revenue, units, cogs, order_count)
+        SELECT n.sale_date, n.region, n.product_id, n.salesperson,
+               SUM(n.quantity * n.unit_price), SUM(n.quantity),
+               SUM(n.quantity * p.cost_price), COUNT(*)
+        FROM new_rows n JOIN products p ON p.id = n.product_id
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (sale_date, region, product_id, salesperson) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            cogs = r.cogs + EXCLUDED.cogs,
+            order_count = r.order_count + EXCLUDED.order_count;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM sales_daily_rollup r
+        USING (SELECT DISTINCT sale_date, region, product_id, salesperson FROM old_rows) k
+        WHERE r.sale_date = k.sale_date AND r.region = k.region
+          AND r.product_id = k.product_id AND r.salesperson = k.salesperson
+          AND r.order_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+SALES_ROLLUP_TRIGGERS_SQL = [
+    "CREATE OR REPLACE TRIGGER sales_rollup_insert AFTER INSERT ON sales "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_apply()",
+    "CREATE OR REPLACE TRIGGER sales_rollup_update AFTER UPDATE ON sales "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_apply()",
+    "CREATE OR REPLACE TRIGGER sales_rollup_delete AFTER DELETE ON sales "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_apply()",
+]
+
+# Only when the rollup is empty but sales are not, i.e. sales predate the triggers
+SALES_ROLLUP_BACKFILL_SQL = """
+INSERT INTO sales_daily_rollup (sale_date, region, product_id, salesperson, revenue, units, cogs, order_count)
+SELECT s.sale_date, s.region, s.product_id, s.salesperson,
+       SUM(s.quantity * s.unit_price), SUM(s.quantity), SUM(s.quantity * p.cost_price), COUNT(*)
+FROM sales s JOIN products p ON p.id = s.product_id
+WHERE NOT EXISTS (SELECT 1 FROM sales_daily_rollup)
+GROUP BY 1, 2, 3, 4
+"""
+
+def upgrade():
+    connection = op.get_bind()
+    baseline_metadata().create_all(bind=connection, checkfirst=True)
+    if connection.dialect.name == "postgresql":
+        connection.execute(sa.text(SALES_ROLLUP_FUNCTION_SQL))
+        for statement in SALES_ROLLUP_TRIGGERS_SQL:
+            connection.execute(sa.text(statement))
+        connection.execute(sa.text(SALES_ROLLUP_BACKFILL_SQL))
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == "postgresql":
+        connection.execute(sa.text("DROP FUNCTION IF EXISTS sales_rollup_apply() CASCADE"))
+    baseline_metadata().drop_all(bind=connection)
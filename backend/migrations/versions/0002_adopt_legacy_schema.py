@@ -0,0 +1,105 @@
+"""Adopt databases created before migrations
+
+Revision ID: 0002_adopt_legacy_schema
+Revises: 0001_baseline
+Create Date: 2026-10-19
+
+0001 only creates missing tables, so databases created by init.sql or by
+create_all boots before sales was partitioned keep their old tables. This
+revision adds customers and sales.customer_id where init.sql left them out and
+converts an unpartitioned sales table to monthly partitions, keeping its rows.
+It fails, leaving the revision unstamped, if any column of this revision's
+schema is still missing. Like 0001, it spells out that schema instead of
+reading the models.
+"""
+
+from alembic import op
+from sqlalchemy import inspect, text
+
+from database_enhanced import DatabaseManager
+
+revision = "0002_adopt_legacy_schema"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# The customers table as of this revision, written out so that later model
+# changes do not change what this migration does
+CUSTOMERS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS customers (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255),
+        phone VARCHAR(50),
+        company VARCHAR(255),
+        address TEXT,
+        city VARCHAR(100),
+        state VARCHAR(100),
+        country VARCHAR(100),
+        postal_code VARCHAR(20),
+        customer_type VARCHAR(50),
+        status VARCHAR(50),
+        credit_limit NUMERIC(12, 2),
+        notes TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        created_by INTEGER REFERENCES users(id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_customers_id ON customers (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_customers_email ON customers (email)",
+    "ALTER TABLE sales ADD COLUMN IF NOT EXISTS customer_id INTEGER REFERENCES customers(id)",
+]
+
+# Indexes of the partitioned sales table as of this revision
+SALES_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS ix_sales_id ON sales (id)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (sale_date)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_product ON sales (product_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_region ON sales (region)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_salesperson ON sales (salesperson)",
+]
+
+# Every column the application relies on as of this revision; columns added by
+# later revisions are theirs to create
+EXPECTED_COLUMNS = {
+    "users": ["id", "email", "name", "role", "hashed_password", "is_active", "permissions",
+              "created_at", "updated_at"],
+    "customers": ["id", "name", "email", "phone", "company", "address", "city", "state", "country",
+                  "postal_code", "customer_type", "status", "credit_limit", "notes",
+                  "created_at", "updated_at", "created_by"],
+    "products": ["id", "name", "category", "unit_price", "cost_price", "stock_quantity", "description",
+                 "created_at", "updated_at"],
+    "sales": ["id", "product_id", "customer_id", "quantity", "unit_price", "sale_date", "customer_name",
+              "region", "salesperson", "profit_margin", "created_at", "updated_at"],
+    "sales_daily_rollup": ["sale_date", "region", "product_id", "salesperson", "revenue", "units",
+                           "cogs", "order_count"],
+}
+
+def missing_columns(connection):
+    inspector = inspect(connection)
+    missing = []
+    for table, columns in EXPECTED_COLUMNS.items():
+        if not inspector.has_table(table):
+            missing.append(table)
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        missing.extend(f"{table}.{column}" for column in columns if column not in existing)
+    return missing
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == "postgresql":
+        for statement in CUSTOMERS_SQL:
+            connection.execute(text(statement))
+        # Triggers on the old table, the rollup's included, are recreated on the new one
+        DatabaseManager().partition_sales_table(connection, index_sql=SALES_INDEXES_SQL)
+
+    missing = missing_columns(connection)
+    if missing:
+        raise RuntimeError(f"Schema does not match the models after adoption; missing: {', '.join(missing)}")
+
+def downgrade():
+    # The conversion keeps every row and column, so there is nothing to undo
+    pass
@@ -4,45 +4,70 @@ Cloud-Ready Production Sales Analytics API Server
 Enhanced with security, rate limiting, and cloud deployment features
 """
 
+import asyncio
+import os
+import time
+from pathlib import Path
+
+# Measured from here so the startup report includes the cost of importing dependencies
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Depends, status, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uvicorn
-import os
 import logging
-import time
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, event, inspect
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from dotenv import load_dotenv
-import redis
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 import json
 
+# Load environment variables before the local modules read them; python-dotenv is
+# only imported when there is a .env file to load
+HERE = Path(__file__).resolve().parent
+ENV_FILE = next((d / ".env" for d in [HERE, *HERE.parents] if (d / ".env").is_file()), None)
+if ENV_FILE:
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+
 # Import database models
-from database_enhanced import get_db, User, Product, Sale, Customer, create_tables
-
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
+from database_enhanced import engine, read_engine, get_db, get_read_session, User, Product, Sale, Customer, SalesDailyRollup, SessionLocal, ensure_schema
+from cache_manager import UserPrincipal, UserPrincipalCache, TaggedResponseCache, RecentWriters
+from rate_limiting import RateLimiter, get_remote_address
+from profiling import ProfileStore, ProfilingMiddleware
+from metrics import MetricsMiddleware, instrument_engine, metrics_endpoint, registry
+from redis_pool import GuardedRedis, create_redis_pool
+from compression import CompressionMiddleware
+from push import PushBroker
+from fieldsets import FINANCIAL, STANDARD, permission_class_for, select_fields
+from arrow_format import ARROW_STREAM, columns_to_ipc, require_representation
+from logging_config import setup_logging, parse_sample_rates
+from projections import (
+    SALE_FIELDS, SALE_FINANCIAL_FIELDS, PRODUCT_FIELDS, PRODUCT_FINANCIAL_FIELDS,
+    allowed_fields, select_sales_page, select_products_page, records_response, encode_value,
+    sales_page_arrow
+)
+
+# Configure logging: handlers only enqueue, a background thread writes JSON lines
+setup_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    log_file=os.getenv("LOG_FILE", "app.log") or None,
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
 )
 logger = logging.getLogger(__name__)
+# High-volume events get their own loggers so LOG_SAMPLE_RATES can thin them out
+auth_logger = logging.getLogger(f"{__name__}.auth")
+http_logger = logging.getLogger(f"{__name__}.http")
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
@@ -53,8 +78,15 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+# Serve aggregates from sales_daily_rollup instead of scanning raw sales
+ANALYTICS_USE_ROLLUP = os.getenv("ANALYTICS_USE_ROLLUP", "true").lower() == "true"
+
+# Rate limiting setup (counters move to Redis once it is connected below)
+limiter = RateLimiter(
+    key_func=get_remote_address,
+    local_max_keys=int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000")),
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -67,7 +99,6 @@ app = FastAPI(
 
 # Add rate limiting
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # CORS middleware with security
 app.add_middleware(
@@ -84,28 +115,232 @@ app.add_middleware(
     allowed_hosts=os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
 )
 
+# Compress large JSON responses (gzip, plus Brotli when the brotli package is installed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+    offload_size=int(os.getenv("COMPRESSION_OFFLOAD_BYTES", "65536"))
+)
+
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+
 # Security
 security = HTTPBearer()
 
-# Redis for session management (optional)
-try:
-    redis_client = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
+# Redis for sessions and shared caches (optional): an async pool with bounded
+# connections and short timeouts behind a circuit breaker, created in the startup
+# hook (never at import) and attached to the components below
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+redis_client: Optional[GuardedRedis] = None
+
+async def connect_redis() -> Optional[GuardedRedis]:
+    """Return the guarded Redis pool, or None when Redis is disabled or not installed"""
+    if not REDIS_HOST:
+        return None
+    client = create_redis_pool(
+        host=REDIS_HOST,
         port=int(os.getenv("REDIS_PORT", "6379")),
         password=os.getenv("REDIS_PASSWORD"),
-        decode_responses=True
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20")),
+        connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5")),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5")),
+        pool_timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "0.1")),
+        call_timeout=float(os.getenv("REDIS_CALL_TIMEOUT", "0.25")),
+        failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("REDIS_BREAKER_RESET_SECONDS", "10"))
     )
-    redis_client.ping()
-    logger.info("Redis connection established")
-except Exception as e:
-    logger.warning(f"Redis not available: {e}")
-    redis_client = None
+    if client is None:
+        return None
+    if await client.ping():
+        logger.info("Redis connection established")
+    else:
+        # Keep the pool: the breaker probes again later and Redis is used once it answers
+        logger.warning(f"Redis not available at {REDIS_HOST}; using local caches until it answers")
+        client.breaker.trip()
+    return client
+
+def attach_redis(client):
+    """Share rate limit counters, principals and cached responses across workers and replicas"""
+    global redis_client
+    redis_client = client
+    for component in (limiter, user_cache, analytics_cache, recent_writers):
+        component.redis_client = client
+
+# Authenticated user principals, shared across replicas through Redis when available
+user_cache = UserPrincipalCache(
+    redis_client=redis_client,
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096")),
+    local_ttl_seconds=float(os.getenv("USER_CACHE_LOCAL_TTL", "30")),
+    redis_ttl_seconds=int(os.getenv("USER_CACHE_REDIS_TTL", "300"))
+)
+
+# Invalidate cached principals whenever a user row is updated or deleted
+@event.listens_for(SessionLocal, "after_flush")
+def collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_emails", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.email)
+            # Also drop the old key when the email itself changed
+            changed.update(previous_values(obj, "email"))
+
+@event.listens_for(SessionLocal, "after_commit")
+def invalidate_changed_users(session):
+    for email in session.info.pop("changed_user_emails", set()):
+        if email:
+            user_cache.invalidate(email)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def discard_changed_users(session):
+    session.info.pop("changed_user_emails", None)
+
+# Analytics responses, shared across replicas through Redis when available
+analytics_cache = TaggedResponseCache(
+    redis_client=redis_client,
+    default_ttl_seconds=int(os.getenv("ANALYTICS_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1024")),
+    key_prefix="analytics:"
+)
+
+# Cache tags invalidated when rows of these models are written
+CACHE_TAGS_BY_MODEL = {Sale: "sales", Product: "products"}
+
+@event.listens_for(SessionLocal, "after_flush")
+def collect_changed_cache_tags(session, flush_context):
+    tags = session.info.setdefault("changed_cache_tags", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tag = CACHE_TAGS_BY_MODEL.get(type(obj))
+        if tag:
+            tags.add(tag)
+
+@event.listens_for(SessionLocal, "after_commit")
+def invalidate_changed_cache_tags(session):
+    tags = session.info.pop("changed_cache_tags", set())
+    if tags:
+        analytics_cache.invalidate_tags(tags)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def discard_changed_cache_tags(session):
+    session.info.pop("changed_cache_tags", None)
+
+# Read-your-writes: users who just wrote read from the primary for a short window
+recent_writers = RecentWriters(
+    redis_client=redis_client,
+    window_seconds=int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+)
+
+@event.listens_for(SessionLocal, "after_flush")
+def flag_session_write(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def record_principal_write(session):
+    principal_email = session.info.get("principal_email")
+    if session.info.pop("wrote", False) and principal_email:
+        recent_writers.mark(principal_email)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def discard_session_write(session):
+    session.info.pop("wrote", None)
+
+# Live updates: new sales and products are pushed to open dashboards once committed
+push_broker = PushBroker(
+    queue_size=int(os.getenv("PUSH_QUEUE_SIZE", "64")),
+    max_subscribers=int(os.getenv("PUSH_MAX_SUBSCRIBERS", "10000")),
+    heartbeat_seconds=float(os.getenv("PUSH_HEARTBEAT_SECONDS", "15"))
+)
+
+PUSHED_SALE_COLUMNS = [
+    "id", "product_id", "customer_id", "customer_name", "quantity", "unit_price",
+    "sale_date", "region", "salesperson", "profit_margin",
+]
+PUSHED_PRODUCT_COLUMNS = ["id", "name", "category", "unit_price", "cost_price", "stock_quantity", "description"]
+
+def created_row_event(obj) -> Tuple[str, Dict[str, Any]]:
+    """Event name and per-permission-class payloads for a newly inserted sale or product"""
+    if isinstance(obj, Sale):
+        sale = {column: getattr(obj, column) for column in PUSHED_SALE_COLUMNS}
+        sale["total_amount"] = obj.quantity * obj.unit_price
+        delta = {"total_revenue": sale["total_amount"], "total_sales": 1}
+        return "sale.created", {
+            FINANCIAL: {"sale": sale, "kpi_delta": delta},
+            STANDARD: {"sale": {k: v for k, v in sale.items() if k not in SALE_FINANCIAL_FIELDS}, "kpi_delta": delta}
+        }
+    product = {column: getattr(obj, column) for column in PUSHED_PRODUCT_COLUMNS}
+    delta = {"total_products": 1}
+    return "product.created", {
+        FINANCIAL: {"product": product, "kpi_delta": delta},
+        STANDARD: {"product": {k: v for k, v in product.items() if k not in PRODUCT_FINANCIAL_FIELDS}, "kpi_delta": delta}
+    }
+
+@event.listens_for(SessionLocal, "after_flush")
+def collect_created_rows(session, flush_context):
+    # Read while the rows are loaded; commit expires them
+    events = session.info.setdefault("push_events", [])
+    for obj in session.new:
+        if isinstance(obj, (Sale, Product)):
+            events.append(created_row_event(obj))
+
+@event.listens_for(SessionLocal, "after_commit")
+def publish_created_rows(session):
+    for name, payloads in session.info.pop("push_events", []):
+        push_broker.publish(name, payloads)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def discard_created_rows(session):
+    session.info.pop("push_events", None)
+
+def previous_values(obj, attribute: str) -> List[Any]:
+    """Return the previous values of an attribute that changed in the current flush"""
+    history = inspect(obj).attrs[attribute].history
+    return list(history.deleted or [])
+
+# Apply pending migrations on startup; a no-op (no DDL, no reflection) when the schema is current
+SCHEMA_AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "true").lower() == "true"
+
+STARTUP_SECONDS = registry.gauge(
+    "app_startup_seconds", "Time spent in each cold start phase", ["phase"])
+
+async def timed_phase(report: Dict[str, float], phase: str, step):
+    """Await one startup step and record how long it took"""
+    started = time.perf_counter()
+    try:
+        return await step
+    finally:
+        report[phase] = round(time.perf_counter() - started, 3)
 
-# Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
-    logger.info("Cloud-ready database tables created successfully")
+    started = time.perf_counter()
+    report = {"import": round(started - IMPORT_STARTED, 3)}
+    # Both steps mostly wait on the network, so they overlap
+    migrated, client = await asyncio.gather(
+        timed_phase(report, "schema", asyncio.to_thread(ensure_schema, SCHEMA_AUTO_MIGRATE)),
+        timed_phase(report, "redis", connect_redis())
+    )
+    if not migrated:
+        logger.info("Database schema is up to date")
+    attach_redis(client)
+    push_broker.attach()
+    if client:
+        # Drops principals invalidated on other replicas from this one's local tier
+        app.state.principal_invalidations = asyncio.create_task(user_cache.listen_for_invalidations())
+    report["startup"] = round(time.perf_counter() - started, 3)
+
+    for phase, seconds in report.items():
+        STARTUP_SECONDS.set(seconds, phase=phase)
+    app.state.startup_report = report
+    logger.info(f"Startup complete: {report}", extra={"startup_seconds": report})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    listener = getattr(app.state, "principal_invalidations", None)
+    if listener:
+        listener.cancel()
+    if redis_client:
+        await redis_client.close()
 
 # Health check endpoint for Railway deployment
 @app.get("/health", response_class=JSONResponse)
@@ -126,6 +361,9 @@ async def health_check():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+# Prometheus scrape endpoint
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Pydantic Models
 class UserLogin(BaseModel):
     email: EmailStr
@@ -157,6 +395,34 @@ class Token(BaseModel):
     token_type: str
     expires_in: int
 
+class SaleResponse(BaseModel):
+    id: int
+    product_id: int
+    product_name: Optional[str] = None
+    product_category: Optional[str] = None
+    customer_id: Optional[int] = None
+    customer_name: str
+    customer_company: Optional[str] = None
+    quantity: int
+    unit_price: float
+    total_amount: float
+    sale_date: date
+    region: str
+    salesperson: str
+    profit_margin: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+class ProductResponse(BaseModel):
+    id: int
+    name: str
+    category: str
+    unit_price: float
+    cost_price: Optional[float] = None
+    stock_quantity: Optional[int] = None
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class KPIMetrics(BaseModel):
     total_revenue: float
     total_sales: int
@@ -197,8 +463,19 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
-    """Get current user from Authorization header with enhanced security"""
+async def load_principal(user_email: str, db: Session) -> Optional[UserPrincipal]:
+    """Principal for an email, from the cache or (in the threadpool) the users table"""
+    principal = await user_cache.get(user_email)
+    if principal is None:
+        generation = await user_cache.generation(user_email)
+        user = await run_in_threadpool(lambda: db.query(User).filter(User.email == user_email).first())
+        if user:
+            principal = UserPrincipal.from_user(user)
+            user_cache.set(principal, generation)
+    return principal
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> UserPrincipal:
+    """Get current user from Authorization header, served from the principal cache when possible"""
     token = credentials.credentials
     payload = verify_token(token)
     
@@ -215,23 +492,74 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid token"
         )
     
-    user = db.query(User).filter(User.email == user_email).first()
-    if not user or not user.is_active:
+    # Lets commit hooks on this request's session attribute writes to the user
+    db.info["principal_email"] = user_email
+    
+    principal = await load_principal(user_email, db)
+    if not principal or not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
     
-    return user
+    return principal
+
+async def wrote_recently(current_user: UserPrincipal = Depends(get_current_user)) -> bool:
+    """Whether the user committed a write within the read-your-writes window"""
+    return await recent_writers.wrote_recently(current_user.email)
+
+def get_read_db(prefer_primary: bool = Depends(wrote_recently), db: Session = Depends(get_db)):
+    """
+    Database session for read-only endpoints, routed to the read replica when it is safe.
+    Primary reads share the request's get_db session: with two primary connections per
+    request, a full pool left every request holding one and waiting for another.
+    """
+    read_db = get_read_session(prefer_primary=prefer_primary, primary=db)
+    try:
+        yield read_db
+    finally:
+        if read_db is not db:
+            read_db.close()
 
-def is_admin(user: User) -> bool:
+def is_admin(user: UserPrincipal) -> bool:
     """Check if user is admin"""
     return user.role == "admin"
 
-def has_financial_access(user: User) -> bool:
+def has_financial_access(user: UserPrincipal) -> bool:
     """Check if user has access to financial data"""
     return user.role == "admin" or "financial" in user.permissions
 
+async def profiling_admin(request: Request) -> Optional[str]:
+    """Email of the active admin behind the request's bearer token, if any"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    payload = verify_token(token) if scheme.lower() == "bearer" else None
+    if not payload or payload.get("type") != "access" or not payload.get("sub"):
+        return None
+    db = SessionLocal()
+    try:
+        principal = await load_principal(payload["sub"], db)
+    finally:
+        db.close()
+    if principal and principal.is_active and is_admin(principal):
+        return principal.email
+    return None
+
+# Admin-requested (X-Profile header) and 1-in-N sampled request profiling
+profile_store = ProfileStore(max_entries=int(os.getenv("PROFILE_STORE_SIZE", "50")))
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    authorize=profiling_admin,
+    sample_every=int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+)
+
+# Added last, so outermost: latency includes every other middleware, profiling too
+app.add_middleware(MetricsMiddleware)
+
+def get_permission_class(user: UserPrincipal) -> str:
+    """Bucket users by the data they may see, for sharing cached responses"""
+    return permission_class_for(has_financial_access(user))
+
 # API Routes
 
 @app.get("/", response_class=JSONResponse)
@@ -250,18 +578,19 @@ async def root():
 @limiter.limit("5/minute")
 async def login(request: Request, user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Authenticate user and return access token with rate limiting"""
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    # Pool checkout, the query and bcrypt all block, so none of them run on the event loop
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == user_credentials.email).first())
     
     if not user or not user.is_active:
-        logger.warning(f"Failed login attempt for email: {user_credentials.email}")
+        auth_logger.warning(f"Failed login attempt for email: {user_credentials.email}", extra={"email": user_credentials.email})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
     # Verify password
-    if not verify_password(user_credentials.password, user.hashed_password):
-        logger.warning(f"Failed login attempt for email: {user_credentials.email}")
+    if not await run_in_threadpool(verify_password, user_credentials.password, user.hashed_password):
+        auth_logger.warning(f"Failed login attempt for email: {user_credentials.email}", extra={"email": user_credentials.email})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -279,7 +608,8 @@ async def login(request: Request, user_credentials: UserLogin, db: Session = Dep
             "role": user.role,
             "login_time": datetime.utcnow().isoformat()
         }
-        redis_client.setex(f"session:{user.id}", 3600, json.dumps(session_data))
+        session_key, raw = f"session:{user.id}", json.dumps(session_data)
+        redis_client.submit(lambda r: r.setex(session_key, 3600, raw))
     
     logger.info(f"User {user.email} logged in successfully")
     
@@ -303,7 +633,7 @@ async def refresh_token(request: Request, refresh_token: str, db: Session = Depe
         )
     
     user_email = payload.get("sub")
-    user = db.query(User).filter(User.email == user_email).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == user_email).first())
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -323,16 +653,18 @@ async def refresh_token(request: Request, refresh_token: str, db: Session = Depe
     }
 
 @app.get("/api/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserPrincipal = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @app.post("/api/auth/logout")
 @limiter.limit("10/minute")
-async def logout(request: Request, current_user: User = Depends(get_current_user)):
+async def logout(request: Request, current_user: UserPrincipal = Depends(get_current_user)):
     """Logout user and invalidate session"""
     if redis_client:
-        redis_client.delete(f"session:{current_user.id}")
+        session_key = f"session:{current_user.id}"
+        redis_client.submit(lambda r: r.delete(session_key))
+    user_cache.invalidate(current_user.email)
     
     logger.info(f"User {current_user.email} logged out")
     
@@ -341,20 +673,61 @@ async def logout(request: Request, current_user: User = Depends(get_current_user
 # Analytics Routes with Enhanced Security
 @app.get("/api/analytics/kpi", response_model=KPIMetrics)
 @limiter.limit("30/minute")
-async def get_kpi_metrics(request: Request, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get KPI metrics for dashboard with rate limiting"""
-    # Calculate enhanced metrics with proper currency handling
-    total_revenue = db.query(func.sum(Sale.quantity * Sale.unit_price)).scalar() or 0
-    total_sales = db.query(Sale).count()
+async def get_kpi_metrics(request: Request, response: Response, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """
+    Get KPI metrics for dashboard with rate limiting, served through the analytics cache.
+    Clients that accept application/vnd.apache.arrow.stream get a one-row Arrow batch.
+    """
+    representation = require_representation(request.headers.get("accept"))
+    permission_class = get_permission_class(current_user)
+    kpis = await analytics_cache.get_or_compute(
+        "kpi",
+        lambda: compute_kpi_metrics(db, include_financials=permission_class == FINANCIAL),
+        permission_class=permission_class,
+        tags=["sales", "products"]
+    )
+    if representation == "arrow":
+        body = columns_to_ipc({name: [value] for name, value in kpis.items()})
+        return Response(content=body, media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+    response.headers["Vary"] = "Accept"
+    return kpis
+
+def uses_sales_rollup(db: Session) -> bool:
+    """The rollup is trigger-maintained on PostgreSQL only; elsewhere aggregate raw sales"""
+    return ANALYTICS_USE_ROLLUP and db.get_bind().dialect.name == "postgresql"
+
+def compute_kpi_metrics(db: Session, include_financials: bool) -> Dict[str, Any]:
+    """Calculate KPI metrics from the database, reading the daily rollup when it is maintained"""
     total_products = db.query(Product).count()
-    average_order_value = total_revenue / total_sales if total_sales > 0 else 0
     
-    # Find top selling product
-    top_product_query = db.query(
-        Product.name,
-        func.sum(Sale.quantity).label('total_quantity')
-    ).join(Sale).group_by(Product.id, Product.name).order_by(desc('total_quantity')).first()
+    if uses_sales_rollup(db):
+        # All-time totals are a sum over daily rollup rows instead of every sale
+        revenue, order_count, cogs = db.query(
+            func.sum(SalesDailyRollup.revenue),
+            func.sum(SalesDailyRollup.order_count),
+            func.sum(SalesDailyRollup.cogs)
+        ).one()
+        top_product_query = db.query(
+            Product.name,
+            func.sum(SalesDailyRollup.units).label('total_quantity')
+        ).join(SalesDailyRollup, SalesDailyRollup.product_id == Product.id).group_by(
+            Product.id, Product.name
+        ).order_by(desc('total_quantity')).first()
+    else:
+        # One pass over raw sales for every total, as the rollup path does
+        revenue, order_count, cogs = db.query(
+            func.sum(Sale.quantity * Sale.unit_price),
+            func.count(Sale.id),
+            func.sum(Sale.quantity * Product.cost_price)
+        ).outerjoin(Product, Product.id == Sale.product_id).one()
+        top_product_query = db.query(
+            Product.name,
+            func.sum(Sale.quantity).label('total_quantity')
+        ).join(Sale).group_by(Product.id, Product.name).order_by(desc('total_quantity')).first()
     
+    total_revenue = float(revenue or 0)
+    total_sales = int(order_count or 0)
+    average_order_value = total_revenue / total_sales if total_sales > 0 else 0
     top_selling_product = top_product_query[0] if top_product_query else "N/A"
     
     # Calculate revenue growth
@@ -362,8 +735,8 @@ async def get_kpi_metrics(request: Request, current_user: User = Depends(get_cur
     
     # Only show profit margin to financial users
     profit_margin = None
-    if has_financial_access(current_user):
-        total_cogs = db.query(func.sum(Sale.quantity * Product.cost_price)).join(Product).scalar() or 0
+    if include_financials:
+        total_cogs = float(cogs or 0)
         gross_profit = total_revenue - total_cogs
         operating_expenses = total_revenue * 0.1
         net_profit = gross_profit - operating_expenses
@@ -378,51 +751,171 @@ async def get_kpi_metrics(request: Request, current_user: User = Depends(get_cur
         top_selling_product=top_selling_product,
         revenue_growth=revenue_growth,
         profit_margin=profit_margin
-    )
+    ).model_dump()
 
 # Sales Routes with Rate Limiting
-@app.get("/api/sales/")
+@app.get("/api/sales/", response_model=List[SaleResponse])
 @limiter.limit("60/minute")
-async def get_sales(request: Request, skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all sales with pagination and rate limiting"""
-    sales = db.query(Sale).offset(skip).limit(limit).all()
-    
-    # Remove profit margin for non-financial users
-    if not has_financial_access(current_user):
-        for sale in sales:
-            sale.profit_margin = None
-    
-    return sales
+async def get_sales(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """
+    Get all sales with product and customer details, pagination and rate limiting.
+    `fields` (e.g. sale_date,total_amount) limits the columns selected; joins are
+    only made when a requested field needs them. Clients that accept
+    application/vnd.apache.arrow.stream get the page as Arrow record batches.
+    """
+    representation = require_representation(request.headers.get("accept"))
+    # Profit margin is never selected for non-financial users
+    fields = select_fields(fields, allowed_fields(SALE_FIELDS, SALE_FINANCIAL_FIELDS, has_financial_access(current_user)))
+    if representation == "arrow":
+        body = await run_in_threadpool(sales_page_arrow, db, skip, limit, fields)
+        return Response(content=body, media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+    rows = await run_in_threadpool(select_sales_page, db, skip, limit, fields)
+    return records_response(fields, rows, headers={"Vary": "Accept"})
 
 # Products Routes with Rate Limiting
-@app.get("/api/products/")
+@app.get("/api/products/", response_model=List[ProductResponse])
 @limiter.limit("60/minute")
-async def get_products(request: Request, skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all products with pagination and rate limiting"""
-    products = db.query(Product).offset(skip).limit(limit).all()
-    
-    # Remove cost data for non-financial users
-    if not has_financial_access(current_user):
-        for product in products:
-            product.cost_price = 0
-            product.profit_margin = None
-    
-    return products
+async def get_products(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """Get all products with pagination and rate limiting; `fields` limits the columns selected"""
+    # Cost data is never selected for non-financial users
+    fields = select_fields(fields, allowed_fields(PRODUCT_FIELDS, PRODUCT_FINANCIAL_FIELDS, has_financial_access(current_user)))
+    return records_response(fields, await run_in_threadpool(select_products_page, db, skip, limit, fields))
+
+# Dashboard bundle
+def read_dashboard(db: Session, sale_fields: List[str], product_fields: List[str], limit: int,
+                   include_financials: bool, compute_kpis: bool):
+    """
+    First pages of sales and products, and the KPIs unless they were cached, in one
+    transaction: from one snapshot on PostgreSQL, so the totals agree with the rows shown
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # The isolation level must be set before the transaction's first statement,
+        # and the auth lookup may already have begun one on this session
+        db.rollback()
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    sales = select_sales_page(db, 0, limit, sale_fields)
+    products = select_products_page(db, 0, limit, product_fields)
+    kpis = compute_kpi_metrics(db, include_financials) if compute_kpis else None
+    return sales, products, kpis
+
+@app.get("/api/dashboard")
+@limiter.limit("30/minute")
+async def get_dashboard(request: Request, limit: int = 100, current_user: UserPrincipal = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    """
+    Everything the dashboard's first view needs in one response: one auth check,
+    then the lists and (on a KPI cache miss) the KPIs from a single read transaction.
+    `last_event_id` lets /api/events replay any change made after the snapshot.
+    """
+    include_financials = has_financial_access(current_user)
+    permission_class = get_permission_class(current_user)
+    sale_fields = allowed_fields(SALE_FIELDS, SALE_FINANCIAL_FIELDS, include_financials)
+    product_fields = allowed_fields(PRODUCT_FIELDS, PRODUCT_FINANCIAL_FIELDS, include_financials)
+    # Taken first: a change committed meanwhile is replayed (and ignored as a duplicate) rather than missed
+    last_event_id = push_broker.last_event_id
+
+    kpi_key, cached_kpis = await analytics_cache.lookup("kpi", permission_class=permission_class, tags=["sales", "products"])
+    sales, products, kpis = await run_in_threadpool(
+        read_dashboard, db, sale_fields, product_fields, limit, include_financials, cached_kpis is None
+    )
+    if kpis is None:
+        kpis = cached_kpis
+    else:
+        analytics_cache.store(kpi_key, kpis)
+
+    body = json.dumps({
+        "status": "healthy",
+        "user": UserResponse.model_validate(current_user).model_dump(),
+        "kpis": kpis,
+        "sales": [dict(zip(sale_fields, row)) for row in sales],
+        "products": [dict(zip(product_fields, row)) for row in products],
+        "last_event_id": last_event_id
+    }, default=encode_value, separators=(",", ":"))
+    return Response(content=body, media_type="application/json")
+
+# Live update routes
+@app.get("/api/events")
+async def live_events(request: Request, token: str, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events stream of new sales and products with the KPI deltas they cause.
+    The token is a query parameter because browsers' EventSource cannot send headers;
+    `last_event_id` resumes after a /api/dashboard snapshot on the first connect.
+    """
+    payload = verify_token(token)
+    if not payload or payload.get("type") != "access" or not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+    db = SessionLocal()
+    try:
+        principal = await load_principal(payload["sub"], db)
+    finally:
+        db.close()
+    if not principal or not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive"
+        )
+    subscriber = push_broker.subscribe(get_permission_class(principal), request.headers.get("last-event-id") or last_event_id)
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections",
+            headers={"Retry-After": "30"}
+        )
+    return push_broker.response(subscriber)
+
+# Admin profiling routes
+def require_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+@app.get("/api/admin/profiles")
+async def list_profiles(current_user: UserPrincipal = Depends(require_admin)):
+    """Recently profiled requests, newest first"""
+    return [record.summary() for record in profile_store.list()]
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 50,
+                      current_user: UserPrincipal = Depends(require_admin)):
+    """Profile stats as text, or as a pstats dump (format=pstats) for snakeviz or flame graph tools"""
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            content=record.stats_dump(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{record.id}.prof"'}
+        )
+    return Response(content=record.stats_text(sort=sort, limit=limit), media_type="text/plain")
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Custom HTTP exception handler"""
-    logger.error(f"HTTP Exception: {exc.status_code} - {exc.detail}")
+    http_logger.error(
+        f"HTTP Exception: {exc.status_code} - {exc.detail}",
+        extra={"status_code": exc.status_code, "method": request.method, "path": request.url.path}
+    )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail, "timestamp": datetime.utcnow().isoformat()}
+        content={"detail": exc.detail, "timestamp": datetime.utcnow().isoformat()},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """General exception handler"""
-    logger.error(f"Unhandled exception: {str(exc)}")
+    logger.error(
+        f"Unhandled exception: {str(exc)}",
+        exc_info=exc,
+        extra={"method": request.method, "path": request.url.path}
+    )
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "timestamp": datetime.utcnow().isoformat()}
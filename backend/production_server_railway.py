@@ -4,18 +4,25 @@ Handles missing database gracefully for initial deployment
 """
 
 import os
+import json
 import logging
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, EmailStr
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import uvicorn
 
+from metrics import MetricsMiddleware, metrics_endpoint
+from compression import CompressionMiddleware, EncodedBodyCache
+from push import PushBroker
+from fieldsets import FINANCIAL, STANDARD, permission_class_for, select_fields, project_records
+from arrow_format import ARROW_STREAM, columns_to_ipc, records_to_ipc, require_representation
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,6 +54,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (gzip, plus Brotli when the brotli package is installed)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_BYTES,
+    offload_size=int(os.getenv("COMPRESSION_OFFLOAD_BYTES", "65536"))
+)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
+# Full sales/product listings are the largest responses and change only on writes:
+# keep them serialized and compressed, dropped by the create endpoints
+response_bodies = EncodedBodyCache(minimum_size=COMPRESSION_MIN_BYTES)
+
+def render_json(records) -> bytes:
+    return json.dumps(records, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+# Live updates for open dashboards, published by the create endpoints
+push_broker = PushBroker(
+    queue_size=int(os.getenv("PUSH_QUEUE_SIZE", "64")),
+    max_subscribers=int(os.getenv("PUSH_MAX_SUBSCRIBERS", "10000")),
+    heartbeat_seconds=float(os.getenv("PUSH_HEARTBEAT_SECONDS", "15"))
+)
+
+@app.on_event("startup")
+async def attach_push_broker():
+    push_broker.attach()
+
+# Fields only users with financial access may see
+FINANCIAL_KPI_FIELDS = ["total_cogs", "gross_profit", "operating_expenses", "net_profit", "gross_profit_margin", "net_profit_margin"]
+FINANCIAL_PRODUCT_FIELDS = ["cost_price", "profit_margin"]
+
 # In-memory data storage (for Railway without database)
 users_db = {
     "admin@example.com": {
@@ -124,6 +164,36 @@ products_data = [
     }
 ]
 
+SALE_FIELDS = ["id", "product_name", "quantity", "unit_price", "sale_date", "customer_name",
+               "region", "salesperson", "total_amount", "profit_margin"]
+# Arrow column types (arrow_format.ARROW_TYPES names); dates are stored as ISO strings
+SALE_FIELD_TYPES = {
+    "id": "int64", "product_name": "string", "quantity": "int64", "unit_price": "float64",
+    "sale_date": "date32", "customer_name": "string", "region": "string", "salesperson": "string",
+    "total_amount": "float64", "profit_margin": "float64",
+}
+PRODUCT_FIELDS = ["id", "name", "category", "unit_price", "cost_price", "stock_quantity", "description", "profit_margin"]
+USER_FIELDS = ["id", "name", "email", "role", "is_active", "permissions", "created_at", "updated_at"]
+
+def load_generated_data(directory: str, max_sales: int):
+    """Read products and sales written by sample_data/generate_sales_data.py into in-memory records"""
+    import pandas as pd
+    
+    products = pd.read_csv(os.path.join(directory, "products.csv"), keep_default_na=False)
+    products["profit_margin"] = ((products["unit_price"] - products["cost_price"]) / products["unit_price"] * 100).round(2)
+    sales = pd.read_csv(os.path.join(directory, "sales.csv"), nrows=max_sales)
+    sales["product_name"] = sales["product_id"].map(products.set_index("id")["name"])
+    sales = sales.rename(columns={"sales_rep": "salesperson"})[SALE_FIELDS]
+    return products.to_dict("records"), sales.to_dict("records")
+
+# Optionally replace the demo records with a generated dataset
+if os.getenv("SAMPLE_DATA_DIR"):
+    products_data, sales_data = load_generated_data(
+        os.getenv("SAMPLE_DATA_DIR"),
+        int(os.getenv("SAMPLE_DATA_MAX_SALES", "100000"))
+    )
+    logger.info(f"Loaded {len(products_data)} products and {len(sales_data)} sales from {os.getenv('SAMPLE_DATA_DIR')}")
+
 # Pydantic models
 class UserCreate(BaseModel):
     name: str
@@ -192,14 +262,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def user_from_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -211,12 +281,57 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise credentials_exception
     return user
 
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return user_from_token(credentials.credentials)
+
 def has_financial_access(user: dict) -> bool:
     """Check if user has financial data access"""
     if user["role"] == "admin":
         return True
     return "financial" in user.get("permissions", [])
 
+def get_permission_class(user: dict) -> str:
+    """Bucket users by the data they may see, for shared payloads"""
+    return permission_class_for(has_financial_access(user))
+
+def list_users() -> List["UserResponse"]:
+    return [
+        UserResponse(
+            id=user["id"],
+            name=user["name"],
+            email=user["email"],
+            role=user["role"],
+            is_active=user["is_active"],
+            permissions=user["permissions"],
+            created_at=user["created_at"],
+            updated_at=user["updated_at"]
+        )
+        for user in users_db.values()
+    ]
+
+def visible_product_fields(user: dict) -> List[str]:
+    if has_financial_access(user):
+        return PRODUCT_FIELDS
+    return [field for field in PRODUCT_FIELDS if field not in FINANCIAL_PRODUCT_FIELDS]
+
+def public_product(product: dict) -> dict:
+    return {k: v for k, v in product.items() if k not in FINANCIAL_PRODUCT_FIELDS}
+
+def sale_kpi_delta(sale: dict, include_financials: bool) -> dict:
+    """Change to each additive KPI from one new sale, computed as in get_kpis"""
+    revenue = sale["total_amount"]
+    delta = {"total_revenue": revenue, "total_sales": 1}
+    if include_financials:
+        cogs = revenue * (1 - sale["profit_margin"]/100)
+        operating_expenses = revenue * 0.15
+        delta.update({
+            "total_cogs": cogs,
+            "gross_profit": revenue - cogs,
+            "operating_expenses": operating_expenses,
+            "net_profit": revenue - cogs - operating_expenses
+        })
+    return delta
+
 # Routes
 @app.get("/")
 async def root():
@@ -235,6 +350,9 @@ async def health_check():
         "database": "in-memory"
     }
 
+# Prometheus scrape endpoint
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 @app.post("/api/auth/login", response_model=Token)
 async def login(login_data: LoginRequest):
     user = users_db.get(login_data.email)
@@ -250,50 +368,74 @@ async def login(login_data: LoginRequest):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+def compute_kpis(include_financials: bool) -> dict:
+    """Key performance indicators from the in-memory sales and products"""
+    # Calculate KPIs from sample data
+    total_revenue = sum(sale["total_amount"] for sale in sales_data)
+    total_sales = len(sales_data)
+    total_products = len(products_data)
+    
+    # Calculate profit metrics
+    total_cogs = sum(sale["total_amount"] * (1 - sale["profit_margin"]/100) for sale in sales_data)
+    gross_profit = total_revenue - total_cogs
+    operating_expenses = total_revenue * 0.15  # Assume 15% operating expenses
+    net_profit = gross_profit - operating_expenses
+    
+    # Calculate margins
+    gross_profit_margin = (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
+    net_profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
+    
+    kpis = {
+        "total_revenue": total_revenue,
+        "total_sales": total_sales,
+        "total_products": total_products,
+        "total_cogs": total_cogs,
+        "gross_profit": gross_profit,
+        "operating_expenses": operating_expenses,
+        "net_profit": net_profit,
+        "gross_profit_margin": round(gross_profit_margin, 2),
+        "net_profit_margin": round(net_profit_margin, 2)
+    }
+    
+    # Hide financial details if user doesn't have access
+    if not include_financials:
+        kpis = {k: v for k, v in kpis.items() if k not in FINANCIAL_KPI_FIELDS}
+    
+    return kpis
+
 @app.get("/api/analytics/kpis")
-async def get_kpis(current_user: dict = Depends(get_current_user)):
-    """Get key performance indicators"""
+async def get_kpis(request: Request, current_user: dict = Depends(get_current_user)):
+    """Get key performance indicators, as a one-row Arrow batch when the client accepts Arrow"""
+    representation = require_representation(request.headers.get("accept"))
     try:
-        # Calculate KPIs from sample data
-        total_revenue = sum(sale["total_amount"] for sale in sales_data)
-        total_sales = len(sales_data)
-        total_products = len(products_data)
-        
-        # Calculate profit metrics
-        total_cogs = sum(sale["total_amount"] * (1 - sale["profit_margin"]/100) for sale in sales_data)
-        gross_profit = total_revenue - total_cogs
-        operating_expenses = total_revenue * 0.15  # Assume 15% operating expenses
-        net_profit = gross_profit - operating_expenses
-        
-        # Calculate margins
-        gross_profit_margin = (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
-        net_profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
-        
-        kpis = {
-            "total_revenue": total_revenue,
-            "total_sales": total_sales,
-            "total_products": total_products,
-            "total_cogs": total_cogs,
-            "gross_profit": gross_profit,
-            "operating_expenses": operating_expenses,
-            "net_profit": net_profit,
-            "gross_profit_margin": round(gross_profit_margin, 2),
-            "net_profit_margin": round(net_profit_margin, 2)
-        }
-        
-        # Hide financial details if user doesn't have access
-        if not has_financial_access(current_user):
-            kpis = {k: v for k, v in kpis.items() if k not in ["total_cogs", "gross_profit", "operating_expenses", "net_profit", "gross_profit_margin", "net_profit_margin"]}
-        
-        return kpis
+        kpis = compute_kpis(has_financial_access(current_user))
     except Exception as e:
         logger.error(f"Error calculating KPIs: {e}")
         raise HTTPException(status_code=500, detail="Error calculating KPIs")
+    if representation == "arrow":
+        body = columns_to_ipc({name: [value] for name, value in kpis.items()})
+        return Response(content=body, media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+    return JSONResponse(kpis, headers={"Vary": "Accept"})
 
 @app.get("/api/sales")
-async def get_sales(current_user: dict = Depends(get_current_user)):
-    """Get all sales data"""
-    return sales_data
+async def get_sales(request: Request, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """
+    Get all sales data, optionally only some fields (?fields=sale_date,total_amount).
+    Clients that accept application/vnd.apache.arrow.stream get Arrow record batches.
+    """
+    representation = require_representation(request.headers.get("accept"))
+    selected = select_fields(fields, SALE_FIELDS)
+    vary = {"Vary": "Accept"}
+    if representation == "arrow":
+        return await response_bodies.respond(
+            request, ("sales", "arrow", tuple(selected)),
+            lambda: records_to_ipc(sales_data, selected, SALE_FIELD_TYPES),
+            media_type=ARROW_STREAM, headers=vary)
+    if selected == SALE_FIELDS:
+        # Records already hold exactly these fields, so they are encoded as they are
+        return await response_bodies.respond(request, ("sales",), lambda: render_json(sales_data), headers=vary)
+    return await response_bodies.respond(
+        request, ("sales", tuple(selected)), lambda: render_json(project_records(sales_data, selected)), headers=vary)
 
 @app.post("/api/sales")
 async def create_sale(sale: SaleCreate, current_user: dict = Depends(get_current_user)):
@@ -311,19 +453,24 @@ async def create_sale(sale: SaleCreate, current_user: dict = Depends(get_current
         "profit_margin": 25.0  # Default profit margin
     }
     sales_data.append(new_sale)
+    response_bodies.invalidate("sales")
+    response_bodies.invalidate("dashboard")
+    push_broker.publish("sale.created", {
+        FINANCIAL: {"sale": new_sale, "kpi_delta": sale_kpi_delta(new_sale, True)},
+        STANDARD: {"sale": new_sale, "kpi_delta": sale_kpi_delta(new_sale, False)}
+    })
     return new_sale
 
 @app.get("/api/products")
-async def get_products(current_user: dict = Depends(get_current_user)):
-    """Get all products"""
-    # Hide cost and profit data if user doesn't have financial access
-    if has_financial_access(current_user):
-        return products_data
-    else:
-        return [
-            {k: v for k, v in product.items() if k not in ["cost_price", "profit_margin"]}
-            for product in products_data
-        ]
+async def get_products(request: Request, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Get all products, optionally only some fields (?fields=id,name,unit_price)"""
+    # Cost and profit fields are not selectable without financial access
+    selected = select_fields(fields, visible_product_fields(current_user))
+    if selected == PRODUCT_FIELDS:
+        return await response_bodies.respond(request, ("products",), lambda: render_json(products_data))
+    # Keyed by fields alone: users who may see more get the same body for the same fields
+    return await response_bodies.respond(
+        request, ("products", tuple(selected)), lambda: render_json(project_records(products_data, selected)))
 
 @app.post("/api/products")
 async def create_product(product: ProductCreate, current_user: dict = Depends(get_current_user)):
@@ -342,27 +489,67 @@ async def create_product(product: ProductCreate, current_user: dict = Depends(ge
         "profit_margin": ((product.unit_price - product.cost_price) / product.unit_price * 100) if product.unit_price > 0 else 0
     }
     products_data.append(new_product)
+    response_bodies.invalidate("products")
+    response_bodies.invalidate("dashboard")
+    push_broker.publish("product.created", {
+        FINANCIAL: {"product": new_product, "kpi_delta": {"total_products": 1}},
+        STANDARD: {"product": public_product(new_product), "kpi_delta": {"total_products": 1}}
+    })
     return new_product
 
+def render_dashboard(include_financials: bool, include_users: bool) -> bytes:
+    # Taken first: a change made while rendering is replayed (and ignored as a duplicate) rather than missed
+    last_event_id = push_broker.last_event_id
+    bundle = {
+        "status": "healthy",
+        "database": "in-memory",
+        "kpis": compute_kpis(include_financials),
+        "sales": sales_data,
+        "products": products_data if include_financials else [public_product(p) for p in products_data],
+        "last_event_id": last_event_id
+    }
+    if include_users:
+        bundle["users"] = [user.model_dump() for user in list_users()]
+    return render_json(bundle)
+
+@app.get("/api/dashboard")
+async def get_dashboard(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Everything the dashboard's first view needs in one response, behind one auth check.
+    The bundle is cached per permission class like the listings it contains, and
+    `last_event_id` lets /api/events replay any change made after it was rendered.
+    """
+    include_financials = has_financial_access(current_user)
+    include_users = current_user["role"] == "admin"
+    return await response_bodies.respond(
+        request,
+        ("dashboard", get_permission_class(current_user), include_users),
+        lambda: render_dashboard(include_financials, include_users)
+    )
+
+@app.get("/api/events")
+async def live_events(request: Request, token: str, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events stream of new sales and products with the KPI deltas they cause.
+    The token is a query parameter because browsers' EventSource cannot send headers;
+    `last_event_id` resumes after a /api/dashboard snapshot on the first connect.
+    """
+    user = user_from_token(token)
+    subscriber = push_broker.subscribe(get_permission_class(user), request.headers.get("last-event-id") or last_event_id)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many live connections", headers={"Retry-After": "30"})
+    return push_broker.response(subscriber)
+
 @app.get("/api/users")
-async def get_users(current_user: dict = Depends(get_current_user)):
-    """Get all users (admin only)"""
+async def get_users(fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Get all users (admin only), optionally only some fields (?fields=id,name,role)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    return [
-        UserResponse(
-            id=user["id"],
-            name=user["name"],
-            email=user["email"],
-            role=user["role"],
-            is_active=user["is_active"],
-            permissions=user["permissions"],
-            created_at=user["created_at"],
-            updated_at=user["updated_at"]
-        )
-        for user in users_db.values()
-    ]
+    selected = select_fields(fields, USER_FIELDS)
+    if selected == USER_FIELDS:
+        return list_users()
+    return [user.model_dump(include=set(selected)) for user in list_users()]
 
 @app.post("/api/users", response_model=UserResponse)
 async def create_user(user: UserCreate, current_user: dict = Depends(get_current_user)):
@@ -385,6 +572,7 @@ async def create_user(user: UserCreate, current_user: dict = Depends(get_current
         "updated_at": datetime.utcnow()
     }
     users_db[user.email] = new_user
+    response_bodies.invalidate("dashboard")
     
     return UserResponse(
         id=new_user["id"],
@@ -431,6 +619,7 @@ async def update_user(user_id: int, user_update: UserUpdate, current_user: dict
         user_to_update["is_active"] = user_update.is_active
     
     user_to_update["updated_at"] = datetime.utcnow()
+    response_bodies.invalidate("dashboard")
     
     return {"message": "User updated successfully"}
 
@@ -453,6 +642,7 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_use
         raise HTTPException(status_code=404, detail="User not found")
     
     del users_db[user_email]
+    response_bodies.invalidate("dashboard")
     return {"message": "User deleted successfully"}
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+On-demand request profiling for Sales Analytics System
+Runs a single request (or 1 in N requests) under cProfile and keeps the result
+in a bounded in-memory store for later retrieval by admins
+"""
+
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+SORT_KEYS = {"cumulative", "tottime", "ncalls", "filename", "name"}
+
+@dataclass
+class ProfileRecord:
+    """One profiled request"""
+    id: str
+    method: str
+    path: str
+    reason: str
+    requested_by: Optional[str] = None
+    status_code: Optional[int] = None
+    duration_ms: Optional[float] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    profiler: Optional[cProfile.Profile] = field(default=None, repr=False)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "requested_by": self.requested_by,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    def stats_text(self, sort: str = "cumulative", limit: int = 50) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.strip_dirs().sort_stats(sort if sort in SORT_KEYS else "cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def stats_dump(self) -> bytes:
+        """Same format as pstats.dump_stats, loadable by snakeviz/flameprof/gprof2dot"""
+        stats = pstats.Stats(self.profiler)
+        return marshal.dumps(stats.stats)
+
+class ProfileStore:
+    """Most recent profiles, oldest evicted first"""
+
+    def __init__(self, max_entries: int = 50):
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, ProfileRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, record: ProfileRecord):
+        with self._lock:
+            self._records[record.id] = record
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        with self._lock:
+            return self._records.get(profile_id)
+
+    def list(self) -> List[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records.values()))
+
+class ProfilingMiddleware:
+    """
+    Profile a request when an admin sends `X-Profile: store` (keep it for later) or
+    `X-Profile: attachment` (return the stats instead of the response body), and
+    additionally profile 1 in every `sample_every` requests into the store.
+
+    cProfile only sees the event loop thread: sync dependencies run in the
+    threadpool are not included, and coroutines of concurrent requests that
+    interleave with the profiled one are.
+    """
+
+    def __init__(self, app, store: ProfileStore,
+                 authorize: Callable[[Request], Awaitable[Optional[str]]],
+                 sample_every: int = 0):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.sample_every = sample_every
+        self._counter = itertools.count(1)
+        # Only one cProfile profiler can be active per interpreter at a time
+        self._active = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = dict(scope["headers"]).get(PROFILE_HEADER.encode(), b"").decode().lower()
+        requested_by = None
+        if mode in ("store", "attachment"):
+            requested_by = await self.authorize(Request(scope))
+            if requested_by is None:
+                mode = ""
+        # Event streams stay open until the client leaves and would hold the profiler that long
+        streaming = b"text/event-stream" in dict(scope["headers"]).get(b"accept", b"")
+        sampled = (not mode and not streaming and self.sample_every > 0
+                   and next(self._counter) % self.sample_every == 0)
+
+        if not (mode or sampled) or not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, mode or "sampled", requested_by)
+        finally:
+            self._active.release()
+
+    async def _profile(self, scope, receive, send, reason: str, requested_by: Optional[str]):
+        record = ProfileRecord(
+            id=uuid.uuid4().hex[:16],
+            method=scope["method"],
+            path=scope["path"],
+            reason=reason,
+            requested_by=requested_by
+        )
+        attach = reason == "attachment"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record.status_code = message["status"]
+                if reason != "sampled":
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", record.id.encode())]}
+            # In attachment mode the real response is discarded and replaced by the stats
+            if not attach:
+                await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            record.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            record.profiler = profiler
+            self.store.add(record)
+            logger.info(f"Profiled {record.method} {record.path} ({reason}) as {record.id}")
+
+        if attach:
+            body = record.stats_text().encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"content-disposition", f'attachment; filename="profile-{record.id}.txt"'.encode()),
+                    (b"x-profile-id", record.id.encode()),
+                    (b"x-profiled-status", str(record.status_code).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
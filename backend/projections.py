@@ -0,0 +1,144 @@
+"""
+Column-projected read path for list endpoints
+Selects only the columns a caller may see as plain row tuples and encodes them
+straight to JSON, skipping ORM hydration, identity-map bookkeeping and
+FastAPI's response model validation
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Sequence
+
+from fastapi.responses import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database_enhanced import Sale, Product, Customer
+from arrow_format import columns_to_ipc, copy_to_ipc
+
+# Field order is the order of keys in each JSON record
+SALE_FIELDS = [
+    "id", "product_id", "product_name", "product_category", "customer_id", "customer_name",
+    "customer_company", "quantity", "unit_price", "total_amount", "sale_date", "region",
+    "salesperson", "profit_margin", "created_at",
+]
+SALE_FINANCIAL_FIELDS = {"profit_margin"}
+SALE_PRODUCT_FIELDS = {"product_name", "product_category"}
+SALE_CUSTOMER_FIELDS = {"customer_name", "customer_company"}
+# Arrow column types (arrow_format.ARROW_TYPES names) of the sales fields
+SALE_FIELD_TYPES = {
+    "id": "int64",
+    "product_id": "int64",
+    "product_name": "string",
+    "product_category": "string",
+    "customer_id": "int64",
+    "customer_name": "string",
+    "customer_company": "string",
+    "quantity": "int64",
+    "unit_price": "float64",
+    "total_amount": "float64",
+    "sale_date": "date32",
+    "region": "string",
+    "salesperson": "string",
+    "profit_margin": "float64",
+    "created_at": "timestamp",
+}
+# Sales columns the page subquery must carry for each field
+SALE_PAGE_COLUMNS = {
+    "id": ["id"],
+    "product_id": ["product_id"],
+    "product_name": ["product_id"],
+    "product_category": ["product_id"],
+    "customer_id": ["customer_id"],
+    "customer_name": ["customer_id", "customer_name"],
+    "customer_company": ["customer_id"],
+    "quantity": ["quantity"],
+    "unit_price": ["unit_price"],
+    "total_amount": ["quantity", "unit_price"],
+    "sale_date": ["sale_date"],
+    "region": ["region"],
+    "salesperson": ["salesperson"],
+    "profit_margin": ["profit_margin"],
+    "created_at": ["created_at"],
+}
+
+PRODUCT_FIELDS = [
+    "id", "name", "category", "unit_price", "cost_price", "stock_quantity", "description",
+    "created_at", "updated_at",
+]
+PRODUCT_FINANCIAL_FIELDS = {"cost_price"}
+
+def allowed_fields(all_fields: Sequence[str], financial_fields: Iterable[str], include_financials: bool) -> List[str]:
+    """Fields visible to a caller; financial columns are never selected for other users"""
+    hidden = set() if include_financials else set(financial_fields)
+    return [field for field in all_fields if field not in hidden]
+
+def sales_page_statement(skip: int, limit: int, fields: Sequence[str]):
+    """
+    One query for a page of sales: the page is cut from sales first, then only
+    that page is joined to products/customers, and only when a requested field needs them.
+    """
+    columns = sorted({column for field in fields for column in SALE_PAGE_COLUMNS[field]})
+    page = select(*(Sale.__table__.c[column] for column in columns)).offset(skip).limit(limit).subquery("page")
+    # Built on demand: the page only has the columns the requested fields need
+    expressions = {
+        "id": lambda: page.c.id,
+        "product_id": lambda: page.c.product_id,
+        "product_name": lambda: Product.name,
+        "product_category": lambda: Product.category,
+        "customer_id": lambda: page.c.customer_id,
+        "customer_name": lambda: func.coalesce(Customer.name, page.c.customer_name),
+        "customer_company": lambda: Customer.company,
+        "quantity": lambda: page.c.quantity,
+        "unit_price": lambda: page.c.unit_price,
+        "total_amount": lambda: page.c.quantity * page.c.unit_price,
+        "sale_date": lambda: page.c.sale_date,
+        "region": lambda: page.c.region,
+        "salesperson": lambda: page.c.salesperson,
+        "profit_margin": lambda: page.c.profit_margin,
+        "created_at": lambda: page.c.created_at,
+    }
+    statement = select(*(expressions[field]().label(field) for field in fields)).select_from(page)
+    if SALE_PRODUCT_FIELDS.intersection(fields):
+        statement = statement.join(Product, Product.id == page.c.product_id)
+    if SALE_CUSTOMER_FIELDS.intersection(fields):
+        statement = statement.outerjoin(Customer, Customer.id == page.c.customer_id)
+    return statement
+
+def select_sales_page(db: Session, skip: int, limit: int, fields: Sequence[str]) -> list:
+    return db.execute(sales_page_statement(skip, limit, fields)).all()
+
+def sales_page_arrow(db: Session, skip: int, limit: int, fields: Sequence[str]) -> bytes:
+    """A page of sales as an Arrow IPC stream, copied straight into columns on PostgreSQL"""
+    statement = sales_page_statement(skip, limit, fields)
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        # Only integer limits are bound, so rendering them inline is safe
+        sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+        return copy_to_ipc(connection.connection.dbapi_connection, sql, fields, SALE_FIELD_TYPES)
+    rows = db.execute(statement).all()
+    return columns_to_ipc(
+        {field: [row[index] for row in rows] for index, field in enumerate(fields)},
+        SALE_FIELD_TYPES
+    )
+
+def select_products_page(db: Session, skip: int, limit: int, fields: Sequence[str]) -> list:
+    statement = select(*(getattr(Product, field) for field in fields)).offset(skip).limit(limit)
+    return db.execute(statement).all()
+
+def encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def records_response(fields: Sequence[str], rows: Iterable[tuple], headers: Dict[str, str] = None) -> Response:
+    """Encode row tuples as a JSON array of objects keyed by `fields`"""
+    body = json.dumps(
+        [dict(zip(fields, row)) for row in rows],
+        default=encode_value,
+        separators=(",", ":")
+    )
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,212 @@
+"""
+Live update push channel for Sales Analytics System
+Server-Sent Events fan-out: a published event is encoded once per permission
+class and queued for every subscriber of that class without waiting on any of
+them. Queues are bounded, so a subscriber that falls a full queue behind is
+evicted; its browser reconnects and replays what it missed from a short
+history, or is told to reload when it fell further behind than that.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from fastapi.responses import StreamingResponse
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PUSH_SUBSCRIBERS = registry.gauge(
+    "push_subscribers", "Open live update streams", ["permission_class"])
+PUSH_EVENTS = registry.counter(
+    "push_events_total", "Events published to live update streams", ["event"])
+PUSH_EVICTIONS = registry.counter(
+    "push_evictions_total", "Subscribers disconnected for falling a full queue behind", ["permission_class"])
+PUSH_REJECTED = registry.counter(
+    "push_rejected_total", "Subscriptions refused because the subscriber limit was reached")
+
+HEARTBEAT = b": keepalive\n\n"
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+# Queued in place of pending frames to end an evicted subscriber's stream
+EVICTED = b""
+
+class Subscriber:
+    __slots__ = ("permission_class", "queue", "last_event_id")
+
+    def __init__(self, permission_class: str, queue_size: int, last_event_id: Optional[str] = None):
+        self.permission_class = permission_class
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.last_event_id = last_event_id
+
+class PushBroker:
+    """
+    In-process event fan-out to SSE subscribers. `publish` is safe to call from
+    sync code in worker threads, e.g. SQLAlchemy commit hooks; events are
+    delivered on the event loop bound by `attach` at startup.
+
+    Event ids are `<boot>-<sequence>`, so a Last-Event-ID from before a restart
+    is recognised as unknown and answered with a resync instead of a wrong replay.
+    """
+
+    def __init__(self, queue_size: int = 64, history_size: int = 256,
+                 max_subscribers: int = 10000, heartbeat_seconds: float = 15.0,
+                 retry_ms: int = 3000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.retry_ms = retry_ms
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.boot = format(int(time.time() * 1000), "x")
+        self._sequence = 0
+        self._history: Deque[Tuple[int, Dict[str, bytes]]] = deque(maxlen=history_size)
+        self._subscribers: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._count = 0
+
+    @property
+    def last_event_id(self) -> str:
+        """Id of the latest published event; subscribing with it replays anything newer"""
+        return f"{self.boot}-{self._sequence}"
+
+    def attach(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Bind the event loop that delivers events; call from the app's startup hook"""
+        self.loop = loop or asyncio.get_running_loop()
+
+    # Publishing
+
+    def publish(self, event: str, payloads: Dict[str, Any]):
+        """Send `payloads[permission_class]` to the subscribers of each class"""
+        if self.loop is None or self.loop.is_closed():
+            # No loop, so no subscribers: only record the event for later replays
+            self._publish(event, payloads)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._publish(event, payloads)
+        else:
+            self.loop.call_soon_threadsafe(self._publish, event, payloads)
+
+    def _publish(self, event: str, payloads: Dict[str, Any]):
+        self._sequence += 1
+        event_id = f"{self.boot}-{self._sequence}"
+        frames = {
+            permission_class: self.encode(event_id, event, payload)
+            for permission_class, payload in payloads.items()
+        }
+        self._history.append((self._sequence, frames))
+        PUSH_EVENTS.inc(event=event)
+
+        for permission_class, frame in frames.items():
+            subscribers = self._subscribers.get(permission_class)
+            if not subscribers:
+                continue
+            overflowed = []
+            for subscriber in subscribers:
+                try:
+                    subscriber.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    overflowed.append(subscriber)
+            for subscriber in overflowed:
+                self.evict(subscriber)
+
+    @staticmethod
+    def encode(event_id: str, event: str, payload: Any) -> bytes:
+        # json.dumps escapes newlines, so the payload always fits on one data line
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+    # Subscriptions
+
+    def subscribe(self, permission_class: str, last_event_id: Optional[str] = None) -> Optional[Subscriber]:
+        """
+        A subscriber to hand to `response`; None when the subscriber limit is reached.
+        It is registered only once its stream starts, whose end always unregisters
+        it, so a client that disconnects before the first byte leaves nothing behind.
+        """
+        if self._count >= self.max_subscribers:
+            PUSH_REJECTED.inc()
+            return None
+        if self.loop is None:
+            self.attach()
+        return Subscriber(permission_class, self.queue_size, last_event_id)
+
+    def _register(self, subscriber: Subscriber):
+        # Replay and registration run together on the loop, so no event falls between them
+        if subscriber.last_event_id:
+            self._replay(subscriber, subscriber.last_event_id)
+        self._subscribers[subscriber.permission_class].add(subscriber)
+        self._count += 1
+        PUSH_SUBSCRIBERS.inc(permission_class=subscriber.permission_class)
+
+    def _replay(self, subscriber: Subscriber, last_event_id: str):
+        """Queue the events after `last_event_id`, or a resync when they are no longer all known"""
+        boot, _, sequence = last_event_id.partition("-")
+        oldest = self._history[0][0] if self._history else self._sequence + 1
+        if boot != self.boot or not sequence.isdigit() or int(sequence) < oldest - 1:
+            subscriber.queue.put_nowait(RESYNC)
+            return
+        missed = [frames[subscriber.permission_class] for seq, frames in self._history
+                  if seq > int(sequence) and subscriber.permission_class in frames]
+        if len(missed) >= self.queue_size:
+            subscriber.queue.put_nowait(RESYNC)
+            return
+        for frame in missed:
+            subscriber.queue.put_nowait(frame)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.permission_class)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        self._count -= 1
+        PUSH_SUBSCRIBERS.dec(permission_class=subscriber.permission_class)
+
+    def evict(self, subscriber: Subscriber):
+        """Drop a subscriber that stopped keeping up; its pending frames are discarded"""
+        self.unsubscribe(subscriber)
+        PUSH_EVICTIONS.inc(permission_class=subscriber.permission_class)
+        queue = subscriber.queue
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(EVICTED)
+        logger.info(f"Evicted slow live update subscriber ({subscriber.permission_class})")
+
+    # Streaming
+
+    async def stream(self, subscriber: Subscriber):
+        """SSE body for one subscriber; frames queued while a send was in progress go out together"""
+        self._register(subscriber)
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode()
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                frames = [frame]
+                while not subscriber.queue.empty():
+                    frames.append(subscriber.queue.get_nowait())
+                if EVICTED in frames:
+                    return
+                yield b"".join(frames)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def response(self, subscriber: Subscriber) -> StreamingResponse:
+        return StreamingResponse(
+            self.stream(subscriber),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Stops nginx-style proxies from buffering the stream
+                "X-Accel-Buffering": "no",
+            }
+        )
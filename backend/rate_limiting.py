@@ -0,0 +1,155 @@
+"""
+Cluster-wide rate limiting for Sales Analytics System
+Sliding-window counters kept in Redis and updated atomically by a Lua script,
+with a bounded in-process fallback when Redis is unavailable
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+RATE_UNITS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Sliding-window counter: the previous window's count is weighted by how much of
+# it still overlaps the sliding window. State is one small hash per client key,
+# and the whole decision (read, decide, increment, expire) is a single round trip.
+# Redis time is used so that replicas with skewed clocks agree on window bounds.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local index = math.floor(now / window)
+
+local state = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local w = tonumber(state[1]) or index
+local c = tonumber(state[2]) or 0
+local p = tonumber(state[3]) or 0
+if index ~= w then
+    if index == w + 1 then p = c else p = 0 end
+    c = 0
+end
+
+local elapsed = (now - index * window) / window
+local allowed = 0
+if p * (1 - elapsed) + c < limit then
+    allowed = 1
+    c = c + 1
+end
+
+redis.call('HSET', KEYS[1], 'w', index, 'c', c, 'p', p)
+redis.call('EXPIRE', KEYS[1], math.ceil(window * 2))
+return {allowed, math.ceil((index + 1) * window - now)}
+"""
+
+def parse_rate(spec: str) -> Tuple[int, int]:
+    """Parse a slowapi-style rate string such as '5/minute' into (limit, window seconds)"""
+    count, _, unit = spec.partition("/")
+    unit = unit.strip().rstrip("s")
+    if unit not in RATE_UNITS:
+        raise ValueError(f"Unsupported rate limit unit in '{spec}'")
+    return int(count), RATE_UNITS[unit]
+
+def get_remote_address(request: Request) -> str:
+    """Client address used as the rate limit key"""
+    return request.client.host if request.client else "127.0.0.1"
+
+class LocalSlidingWindow:
+    """In-process sliding-window counters, bounded to max_keys (least recently used evicted)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int]:
+        now = time.time()
+        index = math.floor(now / window)
+        with self._lock:
+            w, c, p = self._state.get(key, (index, 0, 0))
+            if index != w:
+                p = c if index == w + 1 else 0
+                c = 0
+            elapsed = (now - index * window) / window
+            allowed = p * (1 - elapsed) + c < limit
+            if allowed:
+                c += 1
+            self._state[key] = (index, c, p)
+            self._state.move_to_end(key)
+            while len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+        return allowed, math.ceil((index + 1) * window - now)
+
+class RateLimiter:
+    """
+    Drop-in replacement for slowapi's Limiter decorator.
+    Counters live in Redis when a client is attached, so every worker and replica
+    shares the same budget; otherwise a bounded local window is used.
+    """
+
+    def __init__(self, key_func=get_remote_address, redis_client=None,
+                 key_prefix: str = "rate_limit:", local_max_keys: int = 10000, enabled: bool = True):
+        self.key_func = key_func
+        self.enabled = enabled
+        self.key_prefix = key_prefix
+        self.local = LocalSlidingWindow(max_keys=local_max_keys)
+        self._script = None
+        self.redis_client = redis_client
+
+    @property
+    def redis_client(self):
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, client):
+        """A redis_pool.GuardedRedis; failures and an open circuit fall back to local counters"""
+        self._redis_client = client
+        self._script = client.client.register_script(SLIDING_WINDOW_SCRIPT) if client else None
+
+    async def hit(self, scope: str, identity: str, limit: int, window: int) -> Tuple[bool, int]:
+        """Record one request and return (allowed, seconds until the window rolls over)"""
+        # The hash tag keeps each client's key on a single Redis Cluster slot
+        key = f"{self.key_prefix}{{{scope}:{identity}}}"
+        if self._script is not None:
+            result = await self.redis_client.run(
+                lambda r: self._script(keys=[key], args=[limit, window], client=r))
+            if result is not None:
+                allowed, retry_after = result
+                return bool(allowed), int(retry_after)
+        return self.local.hit(key, limit, window)
+
+    def limit(self, spec: str):
+        """Decorate an endpoint that takes a `request: Request` argument"""
+        limit, window = parse_rate(spec)
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                request: Optional[Request] = kwargs.get("request")
+                if request is None:
+                    request = next(arg for arg in args if isinstance(arg, Request))
+                allowed, retry_after = await self.hit(func.__name__, self.key_func(request), limit, window)
+                if not allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail=f"Rate limit exceeded: {spec}",
+                        headers={"Retry-After": str(max(retry_after, 1))}
+                    )
+                return await func(*args, **kwargs)
+            return wrapper
+        return decorator
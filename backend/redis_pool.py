@@ -0,0 +1,185 @@
+"""
+Async Redis access for Sales Analytics System
+A bounded redis.asyncio connection pool behind a circuit breaker: every call has a
+hard deadline, and once Redis keeps failing calls are skipped outright so that
+callers fall back to their local tiers instead of waiting on timeouts
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_TRANSITIONS = registry.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes", ["breaker", "from_state", "to_state"])
+BREAKER_STATE = registry.gauge(
+    "circuit_breaker_state", "Current circuit breaker state (0 closed, 1 half-open, 2 open)", ["breaker"])
+BREAKER_REJECTED = registry.counter(
+    "circuit_breaker_rejected_total", "Calls skipped because the circuit was open", ["breaker"])
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls are
+    rejected without being attempted; after `reset_timeout` seconds one trial
+    call is let through (half-open) and its outcome closes or re-opens the circuit.
+    Meant to be used from a single event loop, so it takes no locks.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        BREAKER_STATE.set(STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        BREAKER_TRANSITIONS.inc(breaker=self.name, from_state=self.state, to_state=state)
+        BREAKER_STATE.set(STATE_VALUES[state], breaker=self.name)
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Circuit breaker '{self.name}' {self.state} -> {state}")
+        self.state = state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        BREAKER_REJECTED.inc(breaker=self.name)
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def release_trial(self):
+        """Let another call be the trial, when this one was abandoned without an outcome"""
+        self._trial_in_flight = False
+
+    def trip(self):
+        """Open the circuit now, e.g. when Redis is already unreachable at startup"""
+        self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self._transition(OPEN)
+
+class GuardedRedis:
+    """
+    A redis.asyncio client whose calls go through a circuit breaker and a deadline.
+    `run` never raises: a failed, timed out or skipped call returns `default`,
+    so callers only decide what their local fallback is.
+    """
+
+    def __init__(self, client, breaker: CircuitBreaker, timeout: float = 0.25):
+        self.client = client
+        self.breaker = breaker
+        self.timeout = timeout
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background: Set[asyncio.Future] = set()
+
+    async def run(self, operation: Callable[[Any], Awaitable], default: Any = None) -> Any:
+        """Await `operation(client)`, e.g. `lambda r: r.get(key)`"""
+        if not self.breaker.allow():
+            return default
+        try:
+            result = await asyncio.wait_for(operation(self.client), self.timeout)
+        except asyncio.CancelledError:
+            # Neither success nor failure; a half-open trial must not stay taken
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.debug(f"Redis call failed: {e!r}")
+            return default
+        self.breaker.record_success()
+        return result
+
+    def submit(self, operation: Callable[[Any], Awaitable]):
+        """
+        Fire-and-forget `run` for writes nobody waits on. Safe to call from sync code,
+        including SQLAlchemy event hooks on the event loop or in worker threads.
+        Returns the task or future, or None when no loop is attached.
+        """
+        if self.loop is None or self.loop.is_closed():
+            return None
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            future = self.loop.create_task(self.run(operation))
+        else:
+            future = asyncio.run_coroutine_threadsafe(self.run(operation), self.loop)
+        # Keep a reference until done; the loop only holds weak references to tasks
+        self._background.add(future)
+        future.add_done_callback(self._background.discard)
+        return future
+
+    async def ping(self) -> bool:
+        return bool(await self.run(lambda r: r.ping(), default=False))
+
+    async def close(self):
+        # The pool was passed in explicitly, so closing the client leaves it open
+        await self.client.connection_pool.disconnect()
+
+def create_redis_pool(host: str, port: int = 6379, password: Optional[str] = None,
+                      max_connections: int = 20, connect_timeout: float = 0.5,
+                      socket_timeout: float = 0.5, pool_timeout: float = 0.1,
+                      call_timeout: float = 0.25, failure_threshold: int = 5,
+                      reset_timeout: float = 10.0) -> Optional[GuardedRedis]:
+    """
+    Build a guarded client on a BlockingConnectionPool: at most `max_connections`
+    sockets, and a request waits at most `pool_timeout` for a free one.
+    Returns None when the redis package is not installed. Nothing connects yet.
+    """
+    try:
+        from redis.asyncio import BlockingConnectionPool, Redis
+        from redis.asyncio.retry import Retry
+        from redis.backoff import NoBackoff
+    except ImportError:
+        logger.warning("Redis not available: the redis package is not installed")
+        return None
+
+    pool = BlockingConnectionPool(
+        host=host,
+        port=port,
+        password=password,
+        decode_responses=True,
+        max_connections=max_connections,
+        timeout=pool_timeout,
+        socket_connect_timeout=connect_timeout,
+        socket_timeout=socket_timeout,
+        # The breaker decides when to try again; retrying inside a call only
+        # multiplies the time a request waits on an unhealthy server
+        retry=Retry(NoBackoff(), 0)
+    )
+    breaker = CircuitBreaker("redis", failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    guarded = GuardedRedis(Redis(connection_pool=pool), breaker, timeout=call_timeout)
+    try:
+        guarded.loop = asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    return guarded
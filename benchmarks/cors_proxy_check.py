@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Behaviour check for cors-proxy-server.py
+Starts the proxy in-process in front of its local upstream stand-in and checks
+that a slow upstream call does not hold up other requests, that upstream
+connections are kept alive and reused, that bodies stream through in both
+directions, that PUT/DELETE are forwarded, and that an upstream that goes
+silent is answered with 504 after the read timeout. No network access is needed.
+
+Usage:
+    python benchmarks/cors_proxy_check.py [--concurrency 16] [--output report.json]
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_proxy_module():
+    # The file name has dashes, so it is loaded by path rather than imported
+    spec = importlib.util.spec_from_file_location("cors_proxy_server", ROOT / "cors-proxy-server.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients in the fan-out check")
+    parser.add_argument("--slow-seconds", type=float, default=1.0, help="Delay of the slow upstream call")
+    parser.add_argument("--read-timeout", type=float, default=0.5, help="Proxy read timeout in the timeout check")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON to this file")
+    return parser.parse_args()
+
+class Harness:
+    """A stand-in upstream and a proxy in front of it, both on ephemeral ports"""
+
+    def __init__(self, proxy_module, read_timeout: float = 30.0):
+        self.stand_in = proxy_module.StandInServer()
+        proxy_module.start_in_thread(self.stand_in)
+        self.pool = proxy_module.UpstreamPool(max_idle=32, connect_timeout=2.0, read_timeout=read_timeout)
+        self.proxy = proxy_module.CORSProxyServer(("localhost", 0), self.stand_in.url, self.pool)
+        proxy_module.start_in_thread(self.proxy)
+
+    def connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("localhost", self.proxy.server_address[1], timeout=10)
+
+    def request(self, method: str, path: str, body=None, headers=None) -> Tuple[http.client.HTTPResponse, bytes]:
+        connection = self.connection()
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    def close(self):
+        self.proxy.shutdown()
+        self.proxy.server_close()
+        self.stand_in.shutdown()
+        self.stand_in.server_close()
+
+# Checks return (passed, details)
+
+def check_slow_call_isolated(harness: Harness, args) -> Tuple[bool, Dict]:
+    with ThreadPoolExecutor(2) as executor:
+        slow = executor.submit(harness.request, "GET", f"/slow?seconds={args.slow_seconds}")
+        time.sleep(0.05)
+        started = time.perf_counter()
+        response, _ = harness.request("GET", "/health")
+        fast_seconds = time.perf_counter() - started
+        slow_response, _ = slow.result()
+    passed = response.status == 200 and slow_response.status == 200 and fast_seconds < args.slow_seconds / 2
+    return passed, {"fast_request_seconds": round(fast_seconds, 4), "slow_request_seconds": args.slow_seconds}
+
+def check_fan_out(harness: Harness, args) -> Tuple[bool, Dict]:
+    delay = 0.2
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        statuses = list(executor.map(
+            lambda _: harness.request("GET", f"/slow?seconds={delay}")[0].status, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    # Serially this would take concurrency * delay
+    passed = all(status == 200 for status in statuses) and elapsed < delay * args.concurrency / 4
+    return passed, {"requests": args.concurrency, "upstream_delay": delay, "elapsed_seconds": round(elapsed, 4)}
+
+def check_upstream_keep_alive(harness: Harness, args) -> Tuple[bool, Dict]:
+    opened_before, accepted_before = harness.pool.opened, harness.stand_in.connections
+    connection = harness.connection()
+    statuses = []
+    try:
+        for _ in range(50):
+            connection.request("GET", "/health")
+            response = connection.getresponse()
+            response.read()
+            statuses.append(response.status)
+    finally:
+        connection.close()
+    opened = harness.pool.opened - opened_before
+    accepted = harness.stand_in.connections - accepted_before
+    passed = all(status == 200 for status in statuses) and opened <= 1 and accepted <= 1
+    return passed, {"requests": 50, "upstream_connections_opened": opened, "upstream_connections_accepted": accepted}
+
+def check_streamed_response(harness: Harness, args) -> Tuple[bool, Dict]:
+    chunks, interval = 5, 0.3
+    connection = harness.connection()
+    try:
+        started = time.perf_counter()
+        connection.request("GET", f"/stream?chunks={chunks}&interval={interval}")
+        response = connection.getresponse()
+        first_line = response.readline()
+        first_seconds = time.perf_counter() - started
+        rest = response.read()
+        total_seconds = time.perf_counter() - started
+    finally:
+        connection.close()
+    lines = [first_line] + rest.splitlines(keepends=True)
+    passed = (response.status == 200 and len(lines) == chunks
+              and first_seconds < interval and total_seconds >= interval * (chunks - 1))
+    return passed, {
+        "chunks": len(lines),
+        "first_chunk_seconds": round(first_seconds, 4),
+        "whole_body_seconds": round(total_seconds, 4),
+        "transfer_encoding": response.getheader("Transfer-Encoding"),
+    }
+
+def check_streamed_request(harness: Harness, args) -> Tuple[bool, Dict]:
+    parts = [f"part-{index};".encode() for index in range(200)]
+    # An iterable body without Content-Length is sent with chunked transfer coding
+    response, body = harness.request("POST", "/echo", body=iter(parts), headers={"Content-Type": "text/plain"})
+    echoed = json.loads(body)
+    passed = response.status == 200 and echoed["body"].encode() == b"".join(parts)
+    return passed, {"sent_bytes": sum(len(part) for part in parts), "echoed_bytes": len(echoed["body"])}
+
+def check_methods(harness: Harness, args) -> Tuple[bool, Dict]:
+    results = {}
+    payload = json.dumps({"name": "Updated"})
+    for method, body in (("PUT", payload), ("PATCH", payload), ("DELETE", None)):
+        response, raw = harness.request(method, "/proxy/echo", body=body, headers={"Content-Type": "application/json"})
+        echoed = json.loads(raw)
+        results[method] = (response.status == 200 and echoed["method"] == method
+                           and echoed["body"] == (body or "")
+                           and response.getheader("Access-Control-Allow-Origin") == "*")
+    response, _ = harness.request("OPTIONS", "/echo")
+    results["OPTIONS"] = response.status == 200 and "PUT" in response.getheader("Access-Control-Allow-Methods", "")
+    return all(results.values()), results
+
+def check_read_timeout(harness: Harness, args) -> Tuple[bool, Dict]:
+    started = time.perf_counter()
+    response, body = harness.request("GET", f"/slow?seconds={args.read_timeout * 4}")
+    elapsed = time.perf_counter() - started
+    passed = response.status == 504 and elapsed < args.read_timeout * 3
+    return passed, {"status": response.status, "elapsed_seconds": round(elapsed, 4), "body": body.decode()}
+
+CHECKS: List[Tuple[str, Callable, bool]] = [
+    # (name, check, runs against a proxy with the short read timeout)
+    # First, so that it starts from an empty upstream pool
+    ("upstream_keep_alive", check_upstream_keep_alive, False),
+    ("slow_call_isolated", check_slow_call_isolated, False),
+    ("fan_out", check_fan_out, False),
+    ("streamed_response", check_streamed_response, False),
+    ("streamed_request", check_streamed_request, False),
+    ("methods", check_methods, False),
+    ("read_timeout", check_read_timeout, True),
+]
+
+def main():
+    args = parse_args()
+    proxy_module = load_proxy_module()
+    report = {}
+    for short_timeout in (False, True):
+        harness = Harness(proxy_module, args.read_timeout if short_timeout else 30.0)
+        try:
+            for name, check, needs_short_timeout in CHECKS:
+                if needs_short_timeout != short_timeout:
+                    continue
+                passed, details = check(harness, args)
+                report[name] = {"passed": passed, **details}
+                print(f"{'PASS' if passed else 'FAIL'}  {name}  {json.dumps(details)}")
+        finally:
+            harness.close()
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    failed = [name for name, result in report.items() if not result["passed"]]
+    if failed:
+        print(f"Failed checks: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
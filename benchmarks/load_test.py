@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Load-test benchmark for every server variant
+Imports each FastAPI app in-process and drives it through httpx's ASGI transport
+with a fixed number of concurrent virtual users, each running a seeded mix of
+logins, KPI polling, sales/product listing and writes. Reports throughput and
+p50/p95/p99 latency per server and per operation as JSON.
+
+Local stand-ins replace external services: production_server_cloud.py runs on a
+seeded SQLite file, and Redis is left unreachable so every cache and rate limit
+counter uses its in-process tier (rate limiting itself is switched off so it
+does not turn the run into a stream of 429s).
+
+Usage:
+    python benchmarks/load_test.py [--servers simple_server,production_server_cloud]
+        [--concurrency 16] [--requests 2000] [--output results.json] [--compare before.json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+
+REGIONS = ["North", "South", "East", "West", "Central"]
+CATEGORIES = ["Electronics", "Accessories", "Software", "Services"]
+
+# (operation, weight): roughly a dashboard that polls KPIs and pages through lists
+DEFAULT_MIX = [
+    ("login", 2),
+    ("kpi", 40),
+    ("sales_list", 30),
+    ("products_list", 18),
+    ("create_sale", 10),
+]
+
+# An operation builds (method, path, json body) from the virtual user's random generator
+Operation = Callable[[random.Random], Tuple[str, str, Optional[dict]]]
+
+class ServerTarget:
+    """How to import one server variant and which requests make up each operation"""
+
+    def __init__(self, name: str, path: Path, credentials: Dict[str, str],
+                 operations: Dict[str, Operation], uses_bearer_token: bool = True):
+        self.name = name
+        self.path = path
+        self.credentials = credentials
+        self.operations = operations
+        self.uses_bearer_token = uses_bearer_token
+
+    def prepare(self, args):
+        """Set up stand-ins before the module is imported"""
+
+    def load(self):
+        spec = importlib.util.spec_from_file_location(self.name, self.path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[self.name] = module
+        spec.loader.exec_module(module)
+        return module
+
+def demo_sale(rng: random.Random) -> dict:
+    quantity = rng.randint(1, 10)
+    unit_price = round(rng.uniform(10, 1500), 2)
+    return {
+        "product_id": rng.randint(1, 3),
+        "product_name": f"Product {rng.randint(1, 3)}",
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "total_amount": round(quantity * unit_price, 2),
+        "sale_date": (date(2024, 1, 1) + timedelta(days=rng.randint(0, 364))).isoformat(),
+        "customer_name": f"Customer {rng.randint(1, 500)}",
+        "region": rng.choice(REGIONS),
+        "salesperson": f"Rep {rng.randint(1, 25)}",
+    }
+
+def static_operations() -> Dict[str, Operation]:
+    """Endpoints shared by the single-file demo servers (no auth, canned data)"""
+    return {
+        "kpi": lambda rng: ("GET", "/api/analytics/kpis", None),
+        "sales_list": lambda rng: ("GET", "/api/sales", None),
+        "products_list": lambda rng: ("GET", "/api/products", None),
+        "create_sale": lambda rng: ("POST", "/api/sales", demo_sale(rng)),
+    }
+
+class CloudTarget(ServerTarget):
+    """production_server_cloud.py on a seeded SQLite database"""
+
+    def prepare(self, args):
+        self.workdir = Path(tempfile.mkdtemp(prefix="sales-load-test-"))
+        os.environ["DATABASE_URL"] = f"sqlite:///{self.workdir / 'bench.db'}"
+        os.environ.setdefault("REDIS_HOST", "127.0.0.1")
+        os.environ.setdefault("REDIS_PORT", "1")
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        os.environ["LOG_FILE"] = ""
+        # Each in-flight request holds one pooled connection
+        os.environ.setdefault("DB_POOL_SIZE", str(args.concurrency))
+        os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+        self.args = args
+
+    def load(self):
+        import database_enhanced
+        # SQLite cannot autoincrement one column of a composite primary key;
+        # seeded sales carry explicit ids instead
+        database_enhanced.Sale.__table__.c.id.autoincrement = False
+        module = super().load()
+        database_enhanced.create_tables()
+        self.seed(database_enhanced, module)
+        return module
+
+    def seed(self, database_enhanced, server):
+        from sqlalchemy import insert
+
+        rng = random.Random(self.args.seed)
+        products = [
+            {
+                "id": i,
+                "name": f"Product {i}",
+                "category": rng.choice(CATEGORIES),
+                "unit_price": round(rng.uniform(10, 1500), 2),
+                "cost_price": round(rng.uniform(5, 900), 2),
+                "stock_quantity": rng.randint(0, 500),
+            }
+            for i in range(1, self.args.products + 1)
+        ]
+        customers = [
+            {"id": i, "name": f"Customer {i}", "company": f"Company {i % 97 + 1}"}
+            for i in range(1, self.args.customers + 1)
+        ]
+        sales = []
+        for i in range(1, self.args.sales_rows + 1):
+            product = rng.choice(products)
+            sales.append({
+                "id": i,
+                "product_id": product["id"],
+                "customer_id": rng.randint(1, self.args.customers),
+                "customer_name": f"Customer {i % self.args.customers + 1}",
+                "quantity": rng.randint(1, 10),
+                "unit_price": product["unit_price"],
+                "sale_date": date(2024, 1, 1) + timedelta(days=rng.randint(0, 364)),
+                "region": rng.choice(REGIONS),
+                "salesperson": f"Rep {rng.randint(1, 25)}",
+                "profit_margin": round(rng.uniform(5, 45), 2),
+            })
+
+        session = database_enhanced.SessionLocal()
+        try:
+            session.execute(insert(database_enhanced.Product), products)
+            session.execute(insert(database_enhanced.Customer), customers)
+            session.execute(insert(database_enhanced.Sale), sales)
+            session.add(database_enhanced.User(
+                email=self.credentials["email"],
+                name="Load Test Admin",
+                role="admin",
+                hashed_password=server.get_password_hash(self.credentials["password"]),
+                is_active=True,
+                permissions=["financial"]
+            ))
+            session.commit()
+        finally:
+            session.close()
+
+TARGETS: Dict[str, ServerTarget] = {
+    "simple_server": ServerTarget(
+        "simple_server", BACKEND / "simple_server.py",
+        {"email": "admin@example.com", "password": "admin123"},
+        static_operations(), uses_bearer_token=False
+    ),
+    "railway_simple": ServerTarget(
+        "railway_simple", ROOT / "railway_simple.py",
+        {"email": "admin@example.com", "password": "admin123"},
+        static_operations(), uses_bearer_token=False
+    ),
+    "railway_server": ServerTarget(
+        "railway_server", ROOT / "railway_server.py",
+        {"email": "admin@example.com", "password": "admin123"},
+        static_operations(), uses_bearer_token=False
+    ),
+    "production_server_railway": ServerTarget(
+        "production_server_railway", BACKEND / "production_server_railway.py",
+        {"email": "admin@example.com", "password": "admin123"},
+        {
+            "kpi": lambda rng: ("GET", "/api/analytics/kpis", None),
+            "sales_list": lambda rng: ("GET", "/api/sales", None),
+            "products_list": lambda rng: ("GET", "/api/products", None),
+            "create_sale": lambda rng: ("POST", "/api/sales", {
+                key: value for key, value in demo_sale(rng).items() if key not in ("product_id", "total_amount")
+            }),
+        }
+    ),
+    # The cloud server has no write endpoints, so create_sale is left out of its mix
+    "production_server_cloud": CloudTarget(
+        "production_server_cloud", BACKEND / "production_server_cloud.py",
+        {"email": "loadtest-admin@example.com", "password": "loadtest-password"},
+        {
+            "kpi": lambda rng: ("GET", "/api/analytics/kpi", None),
+            "sales_list": lambda rng: ("GET", f"/api/sales/?skip={rng.randrange(0, 2000, 100)}&limit=100", None),
+            "products_list": lambda rng: ("GET", "/api/products/?limit=100", None),
+        }
+    ),
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", default=",".join(TARGETS), help="Comma-separated server variants to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per server")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests per server before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sales-rows", type=int, default=20000, help="Sales seeded for the SQL-backed server")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Print changes against an earlier --output file")
+    return parser.parse_args()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+async def run_server(target: ServerTarget, app, args) -> Dict[str, Any]:
+    import httpx
+
+    mix = [(name, weight) for name, weight in DEFAULT_MIX if name == "login" or name in target.operations]
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    remaining = args.warmup + args.requests
+    samples: List[Tuple[str, float, int]] = []
+    lock = asyncio.Lock()
+
+    async def take_ticket() -> Optional[bool]:
+        """None when the run is over, otherwise whether this request is measured"""
+        nonlocal remaining
+        async with lock:
+            if remaining <= 0:
+                return None
+            remaining -= 1
+            return remaining < args.requests
+
+    async def virtual_user(client, user_id: int):
+        rng = random.Random(args.seed * 1000 + user_id)
+        headers = {}
+        while True:
+            measured = await take_ticket()
+            if measured is None:
+                return
+            operation = "login" if not headers and target.uses_bearer_token else rng.choices(names, weights)[0]
+            if operation == "login":
+                method, path, body = "POST", "/api/auth/login", target.credentials
+            else:
+                method, path, body = target.operations[operation](rng)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if operation == "login" and response.status_code == 200 and target.uses_bearer_token:
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            if measured:
+                samples.append((operation, elapsed_ms, response.status_code))
+
+    # Unhandled server errors are recorded as 500s rather than aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, user_id) for user_id in range(args.concurrency)))
+        duration = time.perf_counter() - started
+
+    status_counts: Dict[str, int] = {}
+    for _, _, status_code in samples:
+        status_counts[str(status_code)] = status_counts.get(str(status_code), 0) + 1
+    operations = {
+        name: latency_summary([elapsed for operation, elapsed, _ in samples if operation == name])
+        for name in names
+    }
+    # Warm-up requests share the wall clock, so throughput counts them too
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status_code in samples if status_code >= 400),
+        "status_counts": status_counts,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round((args.warmup + args.requests) / duration, 1) if duration else 0.0,
+        "latency": latency_summary([elapsed for _, elapsed, _ in samples]),
+        "operations": operations,
+    }
+
+def print_report(results: Dict[str, Any]):
+    print(f"{'server':28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in results.items():
+        latency = result["latency"]
+        print(f"{name:28} {result['throughput_rps']:>9.1f} {latency['p50_ms']:>9.2f} "
+              f"{latency['p95_ms']:>9.2f} {latency['p99_ms']:>9.2f} {result['errors']:>7}")
+
+def print_comparison(previous: Dict[str, Any], current: Dict[str, Any]):
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+    print(f"\n{'server':28} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            print(f"{name:28} {'(new)':>9}")
+            continue
+        print(f"{name:28} {change(before['throughput_rps'], result['throughput_rps']):>9} " + " ".join(
+            f"{change(before['latency'][key], result['latency'][key]):>9}" for key in ("p50_ms", "p95_ms", "p99_ms")
+        ))
+
+def main():
+    args = parse_args()
+    selected = [name.strip() for name in args.servers.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in TARGETS]
+    if unknown:
+        sys.exit(f"Unknown server(s): {', '.join(unknown)}; choose from {', '.join(TARGETS)}")
+
+    # The demo servers read their static files relative to the working directory
+    os.chdir(ROOT)
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = {}
+    for name in selected:
+        target = TARGETS[name]
+        target.prepare(args)
+        app = target.load().app
+        print(f"🚀 {name}: {args.requests} requests at concurrency {args.concurrency}")
+        results[name] = asyncio.run(run_server(target, app, args))
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "mix": dict(DEFAULT_MIX),
+        "servers": results,
+    }
+    print_report(results)
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text())["servers"], results)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Query-count budget check for the SQL-backed API endpoints
+Runs without PostgreSQL: production_server_cloud.py is imported against a small
+seeded SQLite file, every endpoint measured by query_plans.py is called once,
+and the statements each one issues are counted. The run fails when an endpoint
+exceeds its budget in query_plans.MAX_QUERIES, e.g. by loading rows one at a time.
+
+Usage:
+    python benchmarks/query_budget.py [--rows 2000] [--output counts.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+from query_plans import ENDPOINTS, MAX_QUERIES, capture_queries, check_query_budget
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Must match the login body in query_plans.ENDPOINTS
+ADMIN_EMAIL = "bench-admin@example.com"
+ADMIN_PASSWORD = "bench-password"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic sales rows to seed")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Write the query counts as JSON to this file")
+    return parser.parse_args()
+
+def load_app():
+    """Import the cloud server against a fresh SQLite file with caches and Redis out of the way"""
+    workdir = Path(tempfile.mkdtemp(prefix="sales-query-budget-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'budget.db'}"
+    os.environ["ANALYTICS_CACHE_TTL"] = "0"
+    os.environ.setdefault("REDIS_HOST", "127.0.0.1")
+    os.environ.setdefault("REDIS_PORT", "1")
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["LOG_FILE"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, str(ROOT / "backend"))
+    import database_enhanced
+    # SQLite cannot autoincrement one column of a composite primary key;
+    # seeded sales carry explicit ids instead
+    database_enhanced.Sale.__table__.c.id.autoincrement = False
+    import production_server_cloud
+    database_enhanced.create_tables()
+    return database_enhanced, production_server_cloud
+
+def seed(database_enhanced, server, args):
+    from sqlalchemy import insert
+
+    rng = random.Random(args.seed)
+    products = [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "category": rng.choice(["Electronics", "Accessories", "Furniture", "Software"]),
+            "unit_price": round(rng.uniform(10, 1000), 2),
+            "cost_price": round(rng.uniform(5, 500), 2),
+            "stock_quantity": 100,
+        }
+        for i in range(1, args.products + 1)
+    ]
+    customers = [{"id": i, "name": f"Customer {i}"} for i in range(1, args.customers + 1)]
+    sales = []
+    for i in range(1, args.rows + 1):
+        product = rng.choice(products)
+        sales.append({
+            "id": i,
+            "product_id": product["id"],
+            "customer_id": rng.randint(1, args.customers),
+            "customer_name": f"Customer {i % args.customers + 1}",
+            "quantity": rng.randint(1, 10),
+            "unit_price": product["unit_price"],
+            "sale_date": date(2024, 1, 1) + timedelta(days=rng.randint(0, 364)),
+            "region": rng.choice(["North", "South", "East", "West"]),
+            "salesperson": f"Rep {rng.randint(1, 25)}",
+            "profit_margin": round(rng.uniform(5, 45), 2),
+        })
+
+    session = database_enhanced.SessionLocal()
+    try:
+        session.execute(insert(database_enhanced.Product), products)
+        session.execute(insert(database_enhanced.Customer), customers)
+        session.execute(insert(database_enhanced.Sale), sales)
+        session.add(database_enhanced.User(
+            email=ADMIN_EMAIL,
+            name="Benchmark Admin",
+            role="admin",
+            hashed_password=server.get_password_hash(ADMIN_PASSWORD),
+            is_active=True,
+            permissions=["financial"]
+        ))
+        session.commit()
+    finally:
+        session.close()
+
+def count_queries(database_enhanced, server) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    engine = database_enhanced.engine
+    captured, listener = capture_queries(engine)
+    client = TestClient(server.app, base_url="http://localhost")
+    headers = {}
+    results = {}
+
+    try:
+        for name, method, path, body in ENDPOINTS:
+            server.user_cache.clear()
+            captured.clear()
+            response = client.request(method, path, json=body, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: {method} {path} returned {response.status_code}: {response.text}")
+            if name == "auth_login":
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            results[name] = {
+                "query_count": len(captured),
+                "statements": [" ".join(statement.split()) for statement, _ in captured],
+            }
+            print(f"  {name:<24} {len(captured)} queries (budget {MAX_QUERIES.get(name, '-')})")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return results
+
+def main():
+    args = parse_args()
+    database_enhanced, server = load_app()
+    seed(database_enhanced, server, args)
+
+    print("📊 Counting endpoint queries")
+    results = count_queries(database_enhanced, server)
+    if args.output:
+        args.output.write_text(json.dumps({"rows": args.rows, "endpoints": results}, indent=2))
+
+    over_budget = check_query_budget(results)
+    for message in over_budget:
+        print(f"❌ {message}")
+    if over_budget:
+        sys.exit(1)
+    print("✅ Every endpoint is within its query budget")
+
+if __name__ == "__main__":
+    main()
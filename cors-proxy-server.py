@@ -1,99 +1,412 @@
 #!/usr/bin/env python3
 """
 CORS Proxy Server for local development
-This server acts as a proxy to bypass CORS issues during development
+This server acts as a proxy to bypass CORS issues during development.
+Each request is handled on its own thread over pooled keep-alive upstream
+connections, and bodies are streamed through in chunks in both directions, so
+a slow upstream call never holds up other requests.
+Run with --stand-in to proxy to a local upstream stand-in instead of the deployed API.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import urllib.request
-import urllib.parse
+import argparse
+import http.client
 import json
+import os
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TARGET = 'https://data-analytics-master.up.railway.app'
+CHUNK_SIZE = 64 * 1024
+
+# Hop-by-hop headers describe a single connection and are never forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'proxy-connection', 'te', 'trailer', 'transfer-encoding', 'upgrade',
+}
+
+# Replaced by the proxy's own CORS headers instead of being sent twice
+UPSTREAM_CORS_HEADERS = {
+    'access-control-allow-origin', 'access-control-allow-methods',
+    'access-control-allow-headers', 'access-control-allow-credentials',
+}
+
+def read_body(rfile, headers, chunk_size=CHUNK_SIZE):
+    """Yield a request body in chunks, framed by Content-Length or chunked transfer coding"""
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        while True:
+            size = int(rfile.readline().split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip trailers up to the blank line that ends the body
+                while rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            while size > 0:
+                chunk = rfile.read(min(size, chunk_size))
+                if not chunk:
+                    raise ConnectionError('Client closed the connection mid-body')
+                size -= len(chunk)
+                yield chunk
+            rfile.readline()
+    else:
+        remaining = int(headers.get('Content-Length') or 0)
+        while remaining > 0:
+            chunk = rfile.read(min(remaining, chunk_size))
+            if not chunk:
+                raise ConnectionError('Client closed the connection mid-body')
+            remaining -= len(chunk)
+            yield chunk
+
+def has_body(headers):
+    return 'Transfer-Encoding' in headers or int(headers.get('Content-Length') or 0) > 0
+
+class UpstreamPool:
+    """
+    Idle keep-alive connections per upstream origin, shared by all handler threads.
+    Connecting is bounded by `connect_timeout`; every later socket operation,
+    including each wait for the next chunk of a response, by `read_timeout`.
+    """
+
+    def __init__(self, max_idle=8, connect_timeout=5.0, read_timeout=30.0):
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.opened = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, origin):
+        """(connection, reused) for an origin of (scheme, host, port)"""
+        with self._lock:
+            idle = self._idle.get(origin)
+            if idle:
+                return idle.pop(), True
+            self.opened += 1
+        scheme, host, port = origin
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(host, port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection, False
+
+    def release(self, origin, connection):
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            connections = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
 
 class CORSProxyHandler(BaseHTTPRequestHandler):
+    # Keep-alive to the browser; every response is framed by Content-Length or chunked
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CORS-Proxy/2.0'
+
     def do_OPTIONS(self):
         # Handle preflight requests
         self.send_response(200)
         self.send_cors_headers()
+        self.send_header('Content-Length', '0')
         self.end_headers()
-    
+
     def do_GET(self):
         self.handle_request()
-    
+
+    def do_HEAD(self):
+        self.handle_request()
+
     def do_POST(self):
         self.handle_request()
-    
+
+    def do_PUT(self):
+        self.handle_request()
+
+    def do_PATCH(self):
+        self.handle_request()
+
+    def do_DELETE(self):
+        self.handle_request()
+
+    def target_url(self):
+        # Extract the target URL from the path
+        if self.path.startswith('/proxy/'):
+            target_url = self.path[6:]  # Remove '/proxy' prefix
+            if target_url[1:].startswith(('http://', 'https://')):
+                return target_url[1:]
+            return self.server.target + target_url
+        return self.server.target + self.path
+
     def handle_request(self):
+        target_url = self.target_url()
+        parsed = urllib.parse.urlsplit(target_url)
         try:
-            # Extract the target URL from the path
-            if self.path.startswith('/proxy/'):
-                target_url = self.path[7:]  # Remove '/proxy/' prefix
-                if not target_url.startswith('http'):
-                    target_url = 'https://data-analytics-master.up.railway.app' + target_url
-            else:
-                target_url = 'https://data-analytics-master.up.railway.app' + self.path
-            
-            print(f"🔄 Proxying request to: {target_url}")
-            
-            # Make the request to the target server
-            req = urllib.request.Request(target_url)
-            req.add_header('User-Agent', 'CORS-Proxy/1.0')
-            
-            # Forward request headers
-            for header, value in self.headers.items():
-                if header.lower() not in ['host', 'connection']:
-                    req.add_header(header, value)
-            
-            # Handle POST data
-            if self.command == 'POST':
-                content_length = int(self.headers.get('Content-Length', 0))
-                if content_length > 0:
-                    post_data = self.rfile.read(content_length)
-                    req.data = post_data
-                    req.add_header('Content-Length', str(len(post_data)))
-            
-            # Make the request
-            with urllib.request.urlopen(req) as response:
-                # Send response
-                self.send_response(response.status)
-                self.send_cors_headers()
-                
-                # Forward response headers
-                for header, value in response.headers.items():
-                    if header.lower() not in ['content-encoding', 'transfer-encoding']:
-                        self.send_header(header, value)
-                
-                self.end_headers()
-                
-                # Forward response body
-                self.wfile.write(response.read())
-                
-        except Exception as e:
-            print(f"❌ Proxy error: {e}")
-            self.send_response(500)
-            self.send_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
-    
+            origin = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80))
+        except ValueError:
+            origin = None
+        if origin is None or parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            self.send_error_json(400, f'Cannot proxy to {target_url}')
+            self.close_connection = True
+            return
+        path = urllib.parse.urlunsplit(('', '', parsed.path or '/', parsed.query, ''))
+        print(f"🔄 Proxying {self.command} request to: {target_url}")
+
+        headers = {
+            header: value for header, value in self.headers.items()
+            if header.lower() not in HOP_BY_HOP_HEADERS and header.lower() != 'host'
+        }
+        headers['Host'] = parsed.netloc
+        headers.setdefault('User-Agent', 'CORS-Proxy/2.0')
+        body = read_body(self.rfile, self.headers) if has_body(self.headers) else None
+
+        pool = self.server.pool
+        started = relayed = False
+        connection = None
+        try:
+            connection, response = self.send_upstream(origin, path, headers, body)
+            started = True
+            if self.relay_response(response):
+                pool.release(origin, connection)
+                connection = None
+            relayed = True
+        except (socket.timeout, TimeoutError) as e:
+            if not started:
+                self.send_error_json(504, f'Upstream timed out: {e}')
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            if not started:
+                self.send_error_json(502, f'{type(e).__name__}: {e}')
+        finally:
+            if connection is not None:
+                connection.close()
+            if not relayed:
+                # The request body or the response may be only partly transferred
+                self.close_connection = True
+
+    def send_upstream(self, origin, path, headers, body):
+        """
+        Send the request over a pooled connection. A request without a body is
+        sent again when a reused connection turns out to have been closed by the
+        upstream while idle; a fresh connection's failure is final.
+        """
+        pool = self.server.pool
+        while True:
+            connection, reused = pool.acquire(origin)
+            try:
+                connection.request(self.command, path, body=body, headers=headers)
+                return connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused or body is not None:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+    def relay_response(self, response):
+        """Stream the upstream response to the client; True when its connection can be reused"""
+        self.send_response(response.status, response.reason)
+        self.send_cors_headers()
+        for header, value in response.getheaders():
+            name = header.lower()
+            if name in HOP_BY_HOP_HEADERS or name in UPSTREAM_CORS_HEADERS or name in ('date', 'server'):
+                continue
+            self.send_header(header, value)
+
+        bodyless = self.command == 'HEAD' or response.status in (204, 304) or response.status < 200
+        chunked = not bodyless and response.getheader('Content-Length') is None
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        if bodyless:
+            response.close()
+            return not response.will_close
+        # read1 returns whatever has arrived, so each upstream chunk is passed on immediately
+        while True:
+            chunk = response.read1(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        # read1 leaves a fully read Content-Length body open, which would block the next request
+        response.close()
+        return not response.will_close
+
+    def send_error_json(self, status, message):
+        print(f"❌ Proxy error: {message}")
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def send_cors_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', '*')
         self.send_header('Access-Control-Allow-Credentials', 'true')
-    
+
     def log_message(self, format, *args):
         # Suppress default logging
         pass
 
+class CORSProxyServer(ThreadingHTTPServer):
+    """One daemon thread per client connection, all sharing one upstream pool"""
+
+    def __init__(self, address, target, pool, client_timeout=60.0):
+        self.target = target.rstrip('/')
+        self.pool = pool
+        # Idle keep-alive connections from the browser are closed after this long
+        handler = type('Handler', (CORSProxyHandler,), {'timeout': client_timeout})
+        super().__init__(address, handler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+# Local upstream stand-in
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Upstream for exercising the proxy without network access:
+      /health                           JSON status
+      /echo                             method, path, headers and body of the request, any method
+      /slow?seconds=N                   JSON after an N second delay
+      /stream?chunks=N&interval=S       N chunked JSON lines, S seconds apart
+    Every response is keep-alive; `server.connections` counts accepted connections.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CORS-Proxy-StandIn/1.0'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        self.route()
+
+    def do_HEAD(self):
+        self.route()
+
+    def do_POST(self):
+        self.route()
+
+    def do_PUT(self):
+        self.route()
+
+    def do_PATCH(self):
+        self.route()
+
+    def do_DELETE(self):
+        self.route()
+
+    def route(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        query = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        body = b''.join(read_body(self.rfile, self.headers)) if has_body(self.headers) else b''
+        if parsed.path == '/health':
+            self.send_json(200, {"status": "ok"})
+        elif parsed.path == '/echo':
+            self.send_json(200, {
+                "method": self.command,
+                "path": self.path,
+                "headers": dict(self.headers.items()),
+                "body": body.decode('utf-8', 'replace'),
+            })
+        elif parsed.path == '/slow':
+            time.sleep(float(query.get('seconds', 1)))
+            self.send_json(200, {"status": "ok", "slept": float(query.get('seconds', 1))})
+        elif parsed.path == '/stream':
+            self.send_stream(int(query.get('chunks', 5)), float(query.get('interval', 0.1)))
+        else:
+            self.send_json(404, {"detail": "Not Found"})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_stream(self, chunks, interval):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index in range(chunks):
+            if index:
+                time.sleep(interval)
+            line = json.dumps({"chunk": index, "sent_at": time.time()}).encode() + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    def __init__(self, address=('localhost', 0)):
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(address, StandInHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def start_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='CORS proxy for local development')
+    parser.add_argument('--port', type=int, default=int(os.getenv('CORS_PROXY_PORT', 8080)))
+    parser.add_argument('--target', default=os.getenv('CORS_PROXY_TARGET', DEFAULT_TARGET),
+                        help='Upstream that paths are proxied to')
+    parser.add_argument('--stand-in', action='store_true',
+                        help='Start a local upstream stand-in and proxy to it instead of --target')
+    parser.add_argument('--connect-timeout', type=float, default=float(os.getenv('CORS_PROXY_CONNECT_TIMEOUT', 5)),
+                        help='Seconds allowed to connect to the upstream')
+    parser.add_argument('--read-timeout', type=float, default=float(os.getenv('CORS_PROXY_READ_TIMEOUT', 30)),
+                        help='Seconds the upstream may go silent before the request fails with 504')
+    parser.add_argument('--client-timeout', type=float, default=float(os.getenv('CORS_PROXY_CLIENT_TIMEOUT', 60)),
+                        help='Seconds an idle browser connection is kept open')
+    parser.add_argument('--pool-size', type=int, default=int(os.getenv('CORS_PROXY_POOL_SIZE', 8)),
+                        help='Idle keep-alive connections kept per upstream')
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    PORT = 8080
-    print(f"🚀 Starting CORS Proxy Server on port {PORT}")
-    print(f"🌐 Proxy URL: http://localhost:{PORT}")
-    print(f"🔗 Use: http://localhost:{PORT}/proxy/health")
-    print(f"📡 Target: https://data-analytics-master.up.railway.app")
-    
-    server = HTTPServer(('localhost', PORT), CORSProxyHandler)
+    args = parse_args()
+    target = args.target
+    if args.stand_in:
+        stand_in = StandInServer()
+        start_in_thread(stand_in)
+        target = stand_in.url
+
+    pool = UpstreamPool(args.pool_size, args.connect_timeout, args.read_timeout)
+    server = CORSProxyServer(('localhost', args.port), target, pool, args.client_timeout)
+    print(f"🚀 Starting CORS Proxy Server on port {args.port}")
+    print(f"🌐 Proxy URL: http://localhost:{args.port}")
+    print(f"🔗 Use: http://localhost:{args.port}/proxy/health")
+    print(f"📡 Target: {target}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n🛑 Proxy server stopped")
-        server.shutdown()
+    finally:
+        server.server_close()
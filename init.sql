@@ -36,9 +36,10 @@ CREATE TABLE IF NOT EXISTS products (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create sales table
+-- Create sales table, range partitioned by month on sale_date
+-- (the partition key has to be part of the primary key)
 CREATE TABLE IF NOT EXISTS sales (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE RESTRICT,
     quantity INTEGER NOT NULL CHECK (quantity > 0),
     unit_price DECIMAL(10,2) NOT NULL,
@@ -49,10 +50,31 @@ CREATE TABLE IF NOT EXISTS sales (
     salesperson VARCHAR(255) NOT NULL,
     profit_margin DECIMAL(5,2),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create indexes for better performance
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, sale_date)
+) PARTITION BY RANGE (sale_date);
+
+-- Catch-all partition for dates outside the monthly partitions
+CREATE TABLE IF NOT EXISTS sales_default PARTITION OF sales DEFAULT;
+
+-- Monthly partitions from the first seeded month through three months ahead.
+-- Later months are created by: python database_enhanced.py create-partitions
+DO $$
+DECLARE
+    month_start DATE := DATE '2024-01-01';
+BEGIN
+    WHILE month_start <= date_trunc('month', CURRENT_DATE) + INTERVAL '3 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF sales FOR VALUES FROM (%L) TO (%L)',
+            'sales_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+-- Create indexes for better performance (indexes on sales cascade to every partition)
 CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(sale_date);
 CREATE INDEX IF NOT EXISTS idx_sales_product ON sales(product_id);
 CREATE INDEX IF NOT EXISTS idx_sales_region ON sales(region);
@@ -2,14 +2,23 @@
 """
 Railway Complete Server - Serves both frontend and backend
 """
+import gzip
+import hashlib
+import mimetypes
 import os
+import re
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import json
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Create main app
 app = FastAPI(title="Sales Analytics Complete Server")
 
@@ -22,6 +31,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip responses over 1 KB; this server runs standalone, without the backend/ modules
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Add explicit OPTIONS handler for preflight requests
 @app.options("/{path:path}")
 async def options_handler(path: str, request: Request):
@@ -35,13 +47,117 @@ async def options_handler(path: str, request: Request):
         }
     )
 
-# Serve static files (frontend)
-app.mount("/static", StaticFiles(directory="."), name="static")
+# Static assets
+# Read, hashed and compressed once at startup, then served from memory. Only the
+# allowlisted files in STATIC_DIR are reachable; nothing else on disk is.
+
+STATIC_DIR = os.path.abspath(os.getenv("STATIC_DIR", os.path.dirname(os.path.abspath(__file__))))
+STATIC_ASSETS = ("enhanced_dashboard.html", "index.html", "config.js")
+DASHBOARD_ASSET = "enhanced_dashboard.html"
+
+# Fingerprinted URLs change whenever the content does, so browsers may keep them
+# forever; plain names and pages are revalidated with their ETag on every visit
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first when the client accepts both with the same quality
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+def choose_encoding(header):
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        name, _, value = params.strip().partition("=")
+        try:
+            accepted[coding.strip().lower()] = float(value) if name.strip() == "q" else 1.0
+        except ValueError:
+            accepted[coding.strip().lower()] = 0.0
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class StaticAsset:
+    """A file's bytes, content hash and precompressed variants, each with its own strong ETag"""
+
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()
+        stem, extension = os.path.splitext(name)
+        self.fingerprinted = f"{stem}.{digest[:12]}{extension}"
+        self.url = f"/static/{self.fingerprinted}"
+
+        self.variants = {None: body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        # The encodings are different representations, so they get different strong ETags
+        self.etags = {
+            encoding: f'"{digest[:32]}-{encoding}"' if encoding else f'"{digest[:32]}"'
+            for encoding in self.variants
+        }
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or any(etag in if_none_match for etag in self.etags.values()):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            # Already encoded, so GZipMiddleware passes it through untouched
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+def load_static_assets(directory: str, names) -> dict:
+    """
+    Assets by plain and fingerprinted name. Pages are loaded last, so that their
+    references to `/static/<name>` can be rewritten to the fingerprinted URLs.
+    """
+    assets = {}
+    for name in sorted(names, key=lambda name: name.endswith(".html")):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            print(f"Static asset not found, skipping: {path}")
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        if name.endswith(".html"):
+            for asset in list(assets.values()):
+                body = re.sub(rb'(src|href)="/static/' + re.escape(asset.name.encode()) + rb'"',
+                              rb'\1="' + asset.url.encode() + rb'"', body)
+        asset = StaticAsset(name, body)
+        assets[asset.name] = assets[asset.fingerprinted] = asset
+    return assets
+
+static_assets = load_static_assets(STATIC_DIR, STATIC_ASSETS)
+
+@app.api_route("/static/{name}", methods=["GET", "HEAD"])
+async def serve_static(name: str, request: Request):
+    """Serve an allowlisted asset from memory"""
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset.response(request, IMMUTABLE if name == asset.fingerprinted else REVALIDATE)
 
-@app.get("/")
-async def serve_frontend():
+@app.api_route("/", methods=["GET", "HEAD"])
+async def serve_frontend(request: Request):
     """Serve the main dashboard"""
-    return FileResponse("enhanced_dashboard.html")
+    asset = static_assets.get(DASHBOARD_ASSET)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return asset.response(request, REVALIDATE)
 
 @app.get("/health")
 async def health_check():
@@ -5,6 +5,7 @@ Ultra-simple Railway server for immediate deployment
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 import uvicorn
 
@@ -20,6 +21,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip responses over 1 KB; this server runs standalone, without the backend/ modules
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Add explicit OPTIONS handler for preflight requests
 @app.options("/{path:path}")
 async def options_handler(path: str, request: Request):
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for Sales Analytics System
+Writes products.csv, customers.csv and sales.csv with realistic skew: Zipfian
+product and customer popularity, seasonal and weekly sale-date patterns,
+regional mixes and per-region sales teams. Output is deterministic for a given
+seed and produced in vectorized chunks rendered across worker processes (with
+pyarrow's CSV writer when installed), so millions of rows take seconds.
+
+sales.csv uses the sample_data/sales_data.csv columns plus id, customer_id and
+profit_margin, which the bulk loader in backend/database_enhanced.py accepts.
+
+Usage:
+    python sample_data/generate_sales_data.py --rows 10000000 --output-dir sample_data/generated
+    python sample_data/generate_sales_data.py --rows 1000000 --load postgres
+    SAMPLE_DATA_DIR=sample_data/generated python backend/production_server_railway.py
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.csv as pyarrow_csv
+except ImportError:
+    pyarrow_csv = None
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SALES_COLUMNS = [
+    "id", "product_id", "customer_id", "quantity", "unit_price", "total_amount", "sale_date",
+    "region", "customer_name", "sales_rep", "profit_margin",
+]
+
+REGIONS = np.array(["North", "South", "East", "West", "Central"])
+REGION_WEIGHTS = np.array([0.28, 0.17, 0.24, 0.21, 0.10])
+REGION_STATES = {
+    "North": ["MN", "WI", "MI", "ND"],
+    "South": ["TX", "FL", "GA", "AL"],
+    "East": ["NY", "MA", "PA", "NJ"],
+    "West": ["CA", "WA", "OR", "NV"],
+    "Central": ["IL", "MO", "KS", "NE"],
+}
+REPS_PER_REGION = 8
+
+# category: (share of catalogue, median list price, price spread)
+CATEGORIES = {
+    "Electronics": (0.30, 450.0, 0.8),
+    "Accessories": (0.30, 35.0, 0.6),
+    "Software": (0.20, 120.0, 0.9),
+    "Furniture": (0.12, 260.0, 0.5),
+    "Services": (0.08, 900.0, 0.7),
+}
+
+FIRST_NAMES = np.array([
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Sandra", "Steven", "Ashley",
+    "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle", "Kenneth", "Carol", "Kevin", "Amanda",
+])
+LAST_NAMES = np.array([
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+])
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Sales rows to generate")
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2023, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2024, 12, 31))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--product-skew", type=float, default=0.9, help="Zipf exponent of product popularity")
+    parser.add_argument("--customer-skew", type=float, default=0.7, help="Zipf exponent of customer activity")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes rendering chunks")
+    parser.add_argument("--output-dir", type=Path, default=ROOT / "sample_data" / "generated")
+    parser.add_argument("--load", choices=["postgres"], help="Also load the generated files into DATABASE_URL")
+    return parser.parse_args()
+
+def zipf_cdf(n: int, exponent: float) -> np.ndarray:
+    """Cumulative popularity of ranks 1..n under a Zipf law"""
+    weights = 1.0 / np.power(np.arange(1, n + 1, dtype=np.float64), exponent)
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def sample_cdf(rng: np.random.Generator, cdf: np.ndarray, size: int) -> np.ndarray:
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), len(cdf) - 1)
+
+def seasonal_day_cdf(start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+    """Days in range and the cumulative chance of a sale landing on each"""
+    days = pd.date_range(start, end, freq="D")
+    day_of_year = days.dayofyear.to_numpy()
+    weights = 1.0 + 0.25 * np.sin(2 * np.pi * (day_of_year - 80) / 365.25)  # spring/summer swell
+    weights *= np.where(days.month.isin([11, 12]), 1.45, 1.0)                 # holiday quarter
+    weights *= np.where(days.dayofweek >= 5, 0.55, 1.0)                       # quiet weekends
+    weights *= np.linspace(1.0, 1.3, len(days))                               # year-on-year growth
+    cdf = np.cumsum(weights)
+    return days.strftime("%Y-%m-%d").to_numpy(), cdf / cdf[-1]
+
+def generate_products(rng: np.random.Generator, count: int) -> pd.DataFrame:
+    names = list(CATEGORIES)
+    shares = np.array([CATEGORIES[name][0] for name in names])
+    category_index = rng.choice(len(names), size=count, p=shares / shares.sum())
+    medians = np.array([CATEGORIES[name][1] for name in names])[category_index]
+    spreads = np.array([CATEGORIES[name][2] for name in names])[category_index]
+    unit_price = np.round(np.maximum(medians * rng.lognormal(0.0, spreads), 1.0), 2)
+    cost_price = np.round(unit_price * rng.uniform(0.45, 0.85, count), 2)
+    ids = np.arange(1, count + 1)
+    category = np.array(names)[category_index]
+    return pd.DataFrame({
+        "id": ids,
+        "name": pd.Series(category).str.cat(pd.Series(ids).astype(str), sep=" item "),
+        "category": category,
+        "unit_price": unit_price,
+        "cost_price": cost_price,
+        "stock_quantity": rng.integers(0, 1000, count),
+        "description": "",
+    })
+
+def generate_customers(rng: np.random.Generator, count: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Customers table rows, plus each customer's home region index"""
+    ids = pd.Series(np.arange(1, count + 1))
+    first = pd.Series(FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), count)])
+    last = pd.Series(LAST_NAMES[rng.integers(0, len(LAST_NAMES), count)])
+    region_index = rng.choice(len(REGIONS), size=count, p=REGION_WEIGHTS)
+    state_table = np.array([REGION_STATES[name] for name in REGIONS])
+    is_business = rng.random(count) < 0.35
+    suffix = pd.Series(np.array(["LLC", "Inc", "Group", "Partners"])[rng.integers(0, 4, count)])
+    customers = pd.DataFrame({
+        "id": ids,
+        "name": first.str.cat(last, sep=" "),
+        "email": "customer" + ids.astype(str) + "@example.com",
+        "company": last.str.cat(suffix, sep=" ").where(is_business, ""),
+        "state": state_table[region_index, rng.integers(0, state_table.shape[1], count)],
+        "country": "US",
+        "customer_type": np.where(is_business, "business", "individual"),
+    })
+    return customers, region_index
+
+def sales_reps() -> np.ndarray:
+    """REPS_PER_REGION reps for each region, laid out region by region"""
+    names = FIRST_NAMES[::-1].astype(object) + " " + LAST_NAMES.astype(object)
+    return names[:len(REGIONS) * REPS_PER_REGION]
+
+class SalesGenerator:
+    """
+    Draws sales in chunks; products and customers follow independent Zipf laws.
+    Chunk i always uses the i-th child of the seed, so output does not depend on
+    how many worker processes render it.
+    """
+
+    def __init__(self, rng: np.random.Generator, seed: int, products: pd.DataFrame, customers: pd.DataFrame,
+                 customer_regions: np.ndarray, start: date, end: date,
+                 product_skew: float, customer_skew: float, chunk_size: int):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        # Popularity rank is shuffled so that low ids are not always the bestsellers
+        self.product_by_rank = rng.permutation(len(products))
+        self.customer_by_rank = rng.permutation(len(customers))
+        self.product_cdf = zipf_cdf(len(products), product_skew)
+        self.customer_cdf = zipf_cdf(len(customers), customer_skew)
+        self.days, self.day_cdf = seasonal_day_cdf(start, end)
+        self.unit_price = products["unit_price"].to_numpy()
+        self.cost_price = products["cost_price"].to_numpy()
+        self.customer_names = customers["name"].to_numpy()
+        self.customer_regions = customer_regions
+        self.reps = sales_reps()
+
+    def chunk(self, index: int, size: int) -> pd.DataFrame:
+        rng = np.random.default_rng([self.seed, index])
+        product = self.product_by_rank[sample_cdf(rng, self.product_cdf, size)]
+        customer = self.customer_by_rank[sample_cdf(rng, self.customer_cdf, size)]
+
+        # Mostly bought in the customer's home region, otherwise anywhere by the regional mix
+        region = np.where(
+            rng.random(size) < 0.85,
+            self.customer_regions[customer],
+            sample_cdf(rng, np.cumsum(REGION_WEIGHTS) / REGION_WEIGHTS.sum(), size)
+        )
+        rep = self.reps[region * REPS_PER_REGION + rng.integers(0, REPS_PER_REGION, size)]
+
+        quantity = np.minimum(rng.geometric(0.45, size), 50)
+        discount = np.where(rng.random(size) < 0.2, rng.uniform(0.05, 0.25, size), 0.0)
+        unit_price = np.round(self.unit_price[product] * (1 - discount), 2)
+        profit_margin = np.round((unit_price - self.cost_price[product]) / unit_price * 100, 2)
+
+        first_id = index * self.chunk_size + 1
+        return pd.DataFrame({
+            "id": np.arange(first_id, first_id + size),
+            "product_id": product + 1,
+            "customer_id": customer + 1,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_amount": np.round(quantity * unit_price, 2),
+            "sale_date": self.days[sample_cdf(rng, self.day_cdf, size)],
+            "region": REGIONS[region],
+            "customer_name": self.customer_names[customer],
+            "sales_rep": rep,
+            "profit_margin": profit_margin,
+        }, columns=SALES_COLUMNS)
+
+    def render(self, index: int, size: int) -> bytes:
+        """One chunk as headerless CSV; pyarrow's writer is used when it is installed"""
+        frame = self.chunk(index, size)
+        if pyarrow_csv is not None:
+            sink = io.BytesIO()
+            pyarrow_csv.write_csv(
+                pyarrow.Table.from_pandas(frame, preserve_index=False), sink,
+                pyarrow_csv.WriteOptions(include_header=False)
+            )
+            return sink.getvalue()
+        return frame.to_csv(index=False, header=False).encode("utf-8")
+
+# Set in each worker process by init_worker
+worker_generator: Optional[SalesGenerator] = None
+
+def init_worker(generator: SalesGenerator):
+    global worker_generator
+    worker_generator = generator
+
+def render_chunk(task: Tuple[int, int]) -> bytes:
+    return worker_generator.render(*task)
+
+def generate(args) -> Dict[str, Path]:
+    rng = np.random.default_rng(args.seed)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {name: args.output_dir / f"{name}.csv" for name in ("products", "customers", "sales")}
+
+    products = generate_products(rng, args.products)
+    customers, customer_regions = generate_customers(rng, args.customers)
+    products.to_csv(paths["products"], index=False)
+    customers.to_csv(paths["customers"], index=False)
+
+    generator = SalesGenerator(rng, args.seed, products, customers, customer_regions,
+                               args.start, args.end, args.product_skew, args.customer_skew, args.chunk_size)
+    tasks = [
+        (index, min(args.chunk_size, args.rows - offset))
+        for index, offset in enumerate(range(0, args.rows, args.chunk_size))
+    ]
+    started = time.monotonic()
+    with open(paths["sales"], "wb") as sales_file:
+        sales_file.write((",".join(SALES_COLUMNS) + "\n").encode("utf-8"))
+        if args.workers > 1 and len(tasks) > 1:
+            with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(generator,)) as pool:
+                chunks = pool.imap(render_chunk, tasks)
+                write_chunks(sales_file, chunks, tasks, args.rows)
+        else:
+            write_chunks(sales_file, (generator.render(*task) for task in tasks), tasks, args.rows)
+    print(f"\n🌱 Generated {args.products:,} products, {args.customers:,} customers and "
+          f"{args.rows:,} sales in {time.monotonic() - started:.1f}s -> {args.output_dir}")
+    return paths
+
+def write_chunks(sales_file, chunks, tasks, total: int):
+    written = 0
+    for (_, size), chunk in zip(tasks, chunks):
+        sales_file.write(chunk)
+        written += size
+        print(f"\r  {written:,} / {total:,} sales", end="", flush=True)
+
+# Generated ids are explicit, so the id sequences must be moved past them after loading
+RESET_SEQUENCE_SQL = "SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+
+def copy_table(cursor, table: str, path: Path):
+    """COPY a generated file through a staging table; existing ids are left untouched"""
+    with open(path, "r", encoding="utf-8") as csv_file:
+        columns = csv_file.readline().strip()
+        cursor.execute(f"CREATE TEMP TABLE {table}_staging (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        cursor.copy_expert(f"COPY {table}_staging ({columns}) FROM STDIN WITH (FORMAT csv)", csv_file)
+    cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_staging ON CONFLICT (id) DO NOTHING")
+    cursor.execute(RESET_SEQUENCE_SQL.format(table=table))
+
+def load_postgres(paths: Dict[str, Path], args):
+    """Load products and customers, then stream sales through the COPY-based bulk loader"""
+    sys.path.insert(0, str(ROOT / "backend"))
+    from database_enhanced import DatabaseManager, ensure_schema, print_progress
+
+    # Migrated and stamped like a server boot, so the server finds nothing to do
+    ensure_schema()
+    manager = DatabaseManager()
+    first_month = args.start.replace(day=1)
+    months = (date.today().year - first_month.year) * 12 + date.today().month - first_month.month
+    manager.create_sales_partitions(months_ahead=max(months, 0) + 3, start=first_month)
+
+    connection = manager.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        copy_table(cursor, "products", paths["products"])
+        copy_table(cursor, "customers", paths["customers"])
+        connection.commit()
+    finally:
+        connection.close()
+
+    result = manager.bulk_load_sales_csv(str(paths["sales"]), progress_callback=print_progress)
+    with manager.engine.begin() as connection:
+        connection.exec_driver_sql(RESET_SEQUENCE_SQL.format(table="sales"))
+    print(f"\n📦 Loaded {result['rows_loaded']:,} sales ({result['rows_rejected']:,} rejected) "
+          f"in {result['seconds']:.1f}s")
+
+def main():
+    args = parse_args()
+    if args.end < args.start:
+        sys.exit("--end must not be before --start")
+    paths = generate(args)
+    if args.load == "postgres":
+        load_postgres(paths, args)
+
+if __name__ == "__main__":
+    main()